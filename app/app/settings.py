@@ -37,6 +37,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'core',
@@ -45,6 +46,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # first, so that its total covers every other middleware
+    'core.timing.ServerTimingMiddleware',
+    'core.metrics.MetricsMiddleware',
+    'core.slowqueries.SlowQueryMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -91,6 +96,91 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/3.0/topics/cache/
+
+# use a shared backend such as memcached when running several workers,
+# otherwise each process only sees its own invalidations, see RESPONSE_CACHE
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    },
+    'querycache': {
+        'BACKEND': os.environ.get(
+            'QUERYCACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('QUERYCACHE_LOCATION', 'querycache'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+# opt-in cache for querysets of the core models, see core.querycache
+# 'local' keeps an LRU per process, 'shared' uses the querycache alias
+QUERYSET_CACHE = {
+    'BACKEND': os.environ.get('QUERYSET_CACHE_BACKEND', 'local'),
+    'CACHE_ALIAS': 'querycache',
+    'MAX_ENTRIES': 1000,
+    'TIMEOUT': 300,
+}
+
+# ETags and cached responses are keyed on data versions kept in the
+# default cache, which every worker process must share for a write in one
+# to reach the others. With a per process backend they are left out.
+RESPONSE_CACHE = CACHES['default']['BACKEND'] not in (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+# seconds a rendered list or detail response stays in the cache
+RESPONSE_CACHE_TIMEOUT = 300
+
+# delete closed accounts from a thread after the response, see core.purge
+ACCOUNT_PURGE_IN_BACKGROUND = True
+
+# fraction of requests answered with a Server-Timing header and logged to
+# the core.timing logger, see core.timing, none unless set
+SERVER_TIMING_SAMPLE_RATE = float(
+    os.environ.get('SERVER_TIMING_SAMPLE_RATE', '0')
+)
+
+# directory shared by the worker processes of a deployment for their
+# metrics, see core.metrics, clear it when deploying. Unset, /metrics/ only
+# shows the process answering it
+METRICS_DIR = os.environ.get('METRICS_DIR')
+# seconds between writes of a process's metrics to METRICS_DIR
+METRICS_FLUSH_INTERVAL = 1.0
+# bearer token Prometheus scrapes /metrics/ with, unset nobody can
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# queries of a request taking at least this many milliseconds are kept in
+# the slow query log, see core.slowqueries, None turns the log off, as does
+# an empty or "off" environment variable
+SLOW_QUERY_THRESHOLD_MS = os.environ.get(
+    'SLOW_QUERY_THRESHOLD_MS', '200').strip()
+SLOW_QUERY_THRESHOLD_MS = None \
+    if SLOW_QUERY_THRESHOLD_MS.lower() in ('', 'off') \
+    else float(SLOW_QUERY_THRESHOLD_MS)
+# fraction of slow reads run again with EXPLAIN (ANALYZE, BUFFERS)
+SLOW_QUERY_EXPLAIN_RATE = 0.1
+# slow queries kept by each process, the oldest are dropped first
+SLOW_QUERY_LOG_SIZE = 100
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.timing': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
 
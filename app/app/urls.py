@@ -18,8 +18,17 @@ from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
 
+from core.metrics import metrics_view
+from core.views import SlowQueryView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/user/', include('user.urls')),
     path('api/recipe/', include('recipe.urls')),
+    path('metrics/', metrics_view, name='metrics'),
+    path(
+        'api/slow-queries/',
+        SlowQueryView.as_view(),
+        name='slow-queries'
+    ),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,52 @@
+import csv
+import io
+
+from django.db import connections, router, transaction
+from django.db.models import Max
+
+
+def insert_with_ids(model, objs, batch_size=None):
+    """Insert objects with bulk_create, setting their primary keys"""
+    db = router.db_for_write(model)
+    connection = connections[db]
+    manager = model._base_manager.db_manager(db)
+    if connection.features.can_return_rows_from_bulk_insert:
+        # e.g. postgres, INSERT ... RETURNING sets the ids directly
+        return model.objects.db_manager(db).bulk_create(objs, batch_size)
+
+    if connection.vendor == 'sqlite':
+        # sqlite locks the whole database for writing until the end of the
+        # transaction, so every id above the previous maximum is ours and
+        # they are allocated in insertion order
+        with transaction.atomic(using=db):
+            last = manager.aggregate(last=Max('pk'))['last'] or 0
+            model.objects.db_manager(db).bulk_create(objs, batch_size)
+            ids = manager.filter(pk__gt=last).order_by('pk').values_list(
+                'pk', flat=True)
+            for obj, pk in zip(objs, ids):
+                obj.pk = pk
+                obj._state.adding = False
+                obj._state.db = db
+
+        return objs
+
+    for obj in objs:
+        obj.save(force_insert=True, using=db)
+
+    return objs
+
+
+def copy_rows(cursor, table, columns, rows):
+    """Load rows into a table with COPY ... FROM STDIN, postgres only"""
+    buffer = io.StringIO()
+    # strings are quoted, otherwise COPY reads empty ones as NULL
+    csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC).writerows(rows)
+    buffer.seek(0)
+
+    quote = cursor.db.ops.quote_name
+    cursor.copy_expert(
+        'COPY {} ({}) FROM STDIN WITH (FORMAT csv)'.format(
+            quote(table), ', '.join(quote(column) for column in columns)
+        ),
+        buffer
+    )
@@ -0,0 +1,256 @@
+import csv
+import json
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import connections, router, transaction
+
+from core.bulk import copy_rows
+from core.models import Tag, Ingredient, Recipe, ImportCheckpoint
+from core.versions import invalidate
+
+FORMATS = ('ndjson', 'csv')
+
+# relations imported as lists of names, with their staging tables
+RELATIONS = {
+    'tags': (Tag, 'import_recipe_tags'),
+    'ingredients': (Ingredient, 'import_recipe_ingredients'),
+}
+
+
+class ImportFailed(Exception):
+    """A batch could not be imported, earlier batches are kept"""
+
+
+def read_records(file, file_format):
+    """Yield the unparsed records of an NDJSON or CSV recipe export"""
+    if file_format == 'csv':
+        yield from csv.DictReader(file)
+        return
+
+    for line in file:
+        if line.strip():
+            yield line
+
+
+def _clean(model, field, value, label=None):
+    """Return a value converted and validated like the model field would"""
+    try:
+        return model._meta.get_field(field).clean(value, None)
+    except ValidationError as error:
+        raise ValueError(f'invalid {label or field}: {" ".join(error)}')
+
+
+def parse_record(raw):
+    """Return the recipe fields of a record, raising ValueError if invalid"""
+    if isinstance(raw, str):
+        data = json.loads(raw)
+    else:
+        # CSV cells hold related names as JSON lists, see recipe.export
+        data = dict(raw)
+        for field in RELATIONS:
+            data[field] = json.loads(data.get(field) or '[]')
+    if not isinstance(data, dict):
+        raise ValueError('not a JSON object')
+
+    # the limits of the recipe columns, which COPY would otherwise reject
+    # halfway through a batch
+    try:
+        record = {
+            'name': _clean(Recipe, 'name', str(data['name']).strip()),
+            'time_minutes': _clean(
+                Recipe, 'time_minutes', data['time_minutes']),
+            'price': _clean(Recipe, 'price', str(data['price'])),
+            'link': _clean(Recipe, 'link', data.get('link') or ''),
+        }
+    except KeyError as error:
+        raise ValueError(f'missing field {error}')
+
+    for field, (model, _) in RELATIONS.items():
+        names = data.get(field) or []
+        if not isinstance(names, list) or not all(
+                isinstance(name, str) for name in names):
+            raise ValueError(f'{field} must be a list of names')
+        record[field] = [
+            _clean(model, 'name', name.strip(), f'{field} name')
+            for name in names
+        ]
+
+    return record
+
+
+class ModelLoader:
+    """Insert batches with bulk_create, on any database"""
+
+    def load(self, user, records):
+        # the same path as the bulk create endpoint
+        from recipe.bulk import create_recipes
+
+        create_recipes(user, records)
+
+
+class CopyLoader:
+    """Insert batches with COPY into staging tables and set based merges"""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def staging_tables(self, cursor):
+        """Create the session's staging tables unless they exist"""
+        cursor.execute(
+            'CREATE TEMPORARY TABLE IF NOT EXISTS import_recipe ('
+            'seq integer PRIMARY KEY, id integer, '
+            'name varchar(255) NOT NULL, time_minutes integer NOT NULL, '
+            'price numeric(5, 2) NOT NULL, link varchar(255) NOT NULL'
+            ') ON COMMIT DELETE ROWS'
+        )
+        for _, staging in RELATIONS.values():
+            cursor.execute(
+                f'CREATE TEMPORARY TABLE IF NOT EXISTS {staging} ('
+                'seq integer NOT NULL, name varchar(255) NOT NULL'
+                ') ON COMMIT DELETE ROWS'
+            )
+
+    def load(self, user, records):
+        quote = self.connection.ops.quote_name
+        recipe_table = quote(Recipe._meta.db_table)
+        with self.connection.cursor() as cursor:
+            self.staging_tables(cursor)
+            # the rows are only deleted on commit, another batch in the same
+            # transaction would collide with them
+            cursor.execute('TRUNCATE import_recipe, {}'.format(
+                ', '.join(staging for _, staging in RELATIONS.values())))
+            copy_rows(
+                cursor,
+                'import_recipe',
+                ('seq', 'name', 'time_minutes', 'price', 'link'),
+                (
+                    (seq, record['name'], record['time_minutes'],
+                     record['price'], record['link'])
+                    for seq, record in enumerate(records)
+                )
+            )
+            for field, (_, staging) in RELATIONS.items():
+                copy_rows(cursor, staging, ('seq', 'name'), (
+                    (seq, name)
+                    for seq, record in enumerate(records)
+                    for name in dict.fromkeys(record[field])
+                ))
+
+            # queue behind other writers creating names for the same user,
+            # see recipe.bulk.resolve_names
+            cursor.execute(
+                'SELECT 1 FROM {} WHERE id = %s FOR UPDATE'.format(
+                    quote(get_user_model()._meta.db_table)),
+                [user.pk]
+            )
+            for model, staging in RELATIONS.values():
+                cursor.execute(
+                    'INSERT INTO {table} (user_id, name, updated_at, '
+                    'recipe_count) '
+                    'SELECT %s, s.name, now(), 0 '
+                    'FROM (SELECT DISTINCT name FROM {staging}) s '
+                    'WHERE NOT EXISTS (SELECT 1 FROM {table} t '
+                    'WHERE t.user_id = %s AND t.name = s.name)'.format(
+                        table=quote(model._meta.db_table), staging=staging),
+                    [user.pk, user.pk]
+                )
+
+            # ids are allocated up front to map staged rows to recipes
+            cursor.execute(
+                'UPDATE import_recipe '
+                "SET id = nextval(pg_get_serial_sequence(%s, 'id'))",
+                [Recipe._meta.db_table]
+            )
+            cursor.execute(
+                'INSERT INTO {} (id, user_id, name, time_minutes, price, '
+                'link, updated_at) '
+                'SELECT id, %s, name, time_minutes, price, link, now() '
+                'FROM import_recipe'.format(recipe_table),
+                [user.pk]
+            )
+
+            for field, (model, staging) in RELATIONS.items():
+                model_field = Recipe._meta.get_field(field)
+                through = model_field.remote_field.through._meta.db_table
+                column = f'{model_field.m2m_reverse_field_name()}_id'
+                table = quote(model._meta.db_table)
+                cursor.execute(
+                    'INSERT INTO {through} (recipe_id, {column}) '
+                    'SELECT DISTINCT r.id, (SELECT min(t.id) FROM {table} t '
+                    'WHERE t.user_id = %s AND t.name = s.name) '
+                    'FROM {staging} s '
+                    'JOIN import_recipe r ON r.seq = s.seq'.format(
+                        through=quote(through), column=quote(column),
+                        table=table, staging=staging),
+                    [user.pk]
+                )
+                # counters of every name used by the batch, see
+                # core.signals.recount_usage
+                cursor.execute(
+                    'UPDATE {table} SET recipe_count = (SELECT count(*) '
+                    'FROM {through} WHERE {through}.{column} = {table}.id) '
+                    'WHERE user_id = %s AND name IN '
+                    '(SELECT name FROM {staging})'.format(
+                        through=quote(through), column=quote(column),
+                        table=table, staging=staging),
+                    [user.pk]
+                )
+
+        for model in (Tag, Ingredient, Recipe):
+            invalidate(model, [user.pk])
+
+
+def get_loader():
+    """Return the fastest loader for the database recipes are stored in"""
+    connection = connections[router.db_for_write(Recipe)]
+    if connection.vendor == 'postgresql':
+        return CopyLoader(connection)
+
+    return ModelLoader()
+
+
+def import_recipes(user, file, file_format, source, batch_size=10000,
+                   restart=False, report=None):
+    """Import recipes batch by batch, resuming from the last checkpoint"""
+    checkpoint, _ = ImportCheckpoint.objects.get_or_create(
+        user=user,
+        source=source
+    )
+    if restart:
+        checkpoint.position = 0
+        checkpoint.save()
+
+    loader = get_loader()
+    position = checkpoint.position
+    # records before the checkpoint were committed by an earlier run
+    records = islice(read_records(file, file_format), position, None)
+    imported = 0
+    start = time.monotonic()
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            break
+
+        parsed = []
+        for number, raw in enumerate(batch, position + 1):
+            try:
+                parsed.append(parse_record(raw))
+            except ValueError as error:
+                raise ImportFailed(f'Record {number}: {error}')
+
+        # the checkpoint commits together with the batch
+        with transaction.atomic():
+            loader.load(user, parsed)
+            position += len(parsed)
+            ImportCheckpoint.objects.filter(pk=checkpoint.pk).update(
+                position=position
+            )
+
+        imported += len(parsed)
+        if report is not None:
+            report(position, imported, time.monotonic() - start)
+
+    return position, imported, time.monotonic() - start
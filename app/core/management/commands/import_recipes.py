@@ -0,0 +1,60 @@
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core import importer
+
+
+class Command(BaseCommand):
+    """Django command to load recipes exported as NDJSON or CSV"""
+    help = 'Import recipes with their tags and ingredients for a user'
+
+    def add_arguments(self, parser):
+        parser.add_argument('email')
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=importer.FORMATS)
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignore the checkpoint of an earlier run of the same file'
+        )
+
+    def report(self, position, imported, seconds):
+        rate = imported / seconds if seconds else 0
+        self.stdout.write(
+            f'{position} records imported, {rate:.0f} rows/s')
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'No user with email {options["email"]}')
+
+        path = os.path.abspath(options['path'])
+        file_format = options['format'] or (
+            'csv' if path.endswith('.csv') else 'ndjson')
+
+        try:
+            with open(path, newline='', encoding='utf-8') as file:
+                position, imported, seconds = importer.import_recipes(
+                    user,
+                    file,
+                    file_format,
+                    source=path,
+                    batch_size=options['batch_size'],
+                    restart=options['restart'],
+                    report=self.report
+                )
+        except importer.ImportFailed as error:
+            raise CommandError(
+                f'{error}. Fix the file and run the command again to resume '
+                'after the last imported batch.'
+            )
+
+        rate = imported / seconds if seconds else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} recipes in {seconds:.1f}s '
+            f'({rate:.0f} rows/s), {position} in total'
+        ))
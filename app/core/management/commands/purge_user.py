@@ -0,0 +1,26 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core import purge
+
+
+class Command(BaseCommand):
+    """Django command to delete a user account and all its data"""
+    help = 'Delete a user and everything they own in set based chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('email')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=purge.PURGE_CHUNK_SIZE
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'No user with email {options["email"]}')
+
+        purge.purge_user(user.pk, chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Purged {options["email"]}'))
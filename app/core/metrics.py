@@ -0,0 +1,273 @@
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+from core.timing import QueryTimer, wrap_connections
+
+logger = logging.getLogger(__name__)
+
+# upper bounds of the histogram buckets of each histogram, in seconds
+HISTOGRAM_BUCKETS = {
+    'http_request_duration_seconds': (
+        0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+    ),
+}
+
+# help lines of the metrics in the Prometheus output
+DESCRIPTIONS = {
+    'http_requests_total': 'Requests by resolved URL name, method and status',
+    'http_request_duration_seconds': 'Request latency in seconds',
+    'db_queries_total': 'Database queries run by requests',
+    'db_query_duration_seconds_total': 'Time requests spent in queries',
+    'cache_requests_total': 'Cache lookups by cache and result',
+    'cache_hit_ratio': 'Share of cache lookups that were hits',
+}
+
+
+class Registry:
+    """Counters and fixed bucket histograms of the current process"""
+    # with settings.METRICS_DIR set, every process writes its values to its
+    # own file there and the endpoint adds up the files of all processes
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = defaultdict(float)
+        self.histograms = {}
+        self.last_flush = 0.0
+        self._pid = None
+        self._started = None
+
+    def inc(self, name, labels, amount=1):
+        """Add to a counter"""
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] += amount
+        self._maybe_flush()
+
+    def observe(self, name, labels, value):
+        """Record a value in a histogram"""
+        key = (name, tuple(sorted(labels.items())))
+        buckets = HISTOGRAM_BUCKETS[name]
+        with self.lock:
+            # one count per bucket, then +Inf, then the sum of the values
+            counts = self.histograms.setdefault(key, [0] * (len(buckets) + 2))
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            else:
+                counts[len(buckets)] += 1
+            counts[-1] += value
+        self._maybe_flush()
+
+    def snapshot(self):
+        """Return the values as JSON serializable lists"""
+        with self.lock:
+            return {
+                'counters': [
+                    [name, dict(labels), value]
+                    for (name, labels), value in self.counters.items()
+                ],
+                'histograms': [
+                    [name, dict(labels), list(counts)]
+                    for (name, labels), counts in self.histograms.items()
+                ],
+            }
+
+    def reset(self):
+        """Forget every value of this process"""
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def _path(self, directory):
+        pid = os.getpid()
+        if self._pid != pid:
+            # the start time keeps a reused pid from overwriting the file
+            # of an earlier process, whose counts must still be added up
+            self._pid = pid
+            self._started = time.time_ns()
+
+        return os.path.join(directory, f'{pid}-{self._started}.json')
+
+    def flush(self):
+        """Write the values of this process to its file, if shared"""
+        directory = settings.METRICS_DIR
+        if directory is None:
+            return
+        os.makedirs(directory, exist_ok=True)
+        path = self._path(directory)
+        snapshot = self.snapshot()
+        self.last_flush = time.monotonic()
+        # replaced in one step, readers never see a partial file
+        temporary = f'{path}.{threading.get_ident()}.tmp'
+        with open(temporary, 'w') as file:
+            json.dump(snapshot, file)
+        os.replace(temporary, path)
+
+    def _maybe_flush(self):
+        if time.monotonic() - self.last_flush < \
+                settings.METRICS_FLUSH_INTERVAL:
+            return
+        try:
+            self.flush()
+        except OSError:
+            # metrics must never fail the request being counted
+            logger.exception('Could not write metrics')
+
+    def collect(self):
+        """Return the values added up over every process"""
+        directory = settings.METRICS_DIR
+        if directory is None:
+            snapshots = [self.snapshot()]
+        else:
+            self.flush()
+            snapshots = []
+            for name in os.listdir(directory):
+                if not name.endswith('.json'):
+                    continue
+                try:
+                    with open(os.path.join(directory, name)) as file:
+                        snapshots.append(json.load(file))
+                except (OSError, ValueError):
+                    # removed since it was listed
+                    continue
+
+        counters = defaultdict(float)
+        histograms = {}
+        for snapshot in snapshots:
+            for name, labels, value in snapshot['counters']:
+                counters[name, tuple(sorted(labels.items()))] += value
+            for name, labels, counts in snapshot['histograms']:
+                key = (name, tuple(sorted(labels.items())))
+                if key in histograms:
+                    histograms[key] = [
+                        total + count
+                        for total, count in zip(histograms[key], counts)
+                    ]
+                else:
+                    histograms[key] = counts
+
+        return counters, histograms
+
+
+registry = Registry()
+
+
+def record_cache(cache, hit):
+    """Count a cache lookup"""
+    registry.inc(
+        'cache_requests_total',
+        {'cache': cache, 'result': 'hit' if hit else 'miss'}
+    )
+
+
+def _labels(labels, **extra):
+    """Format Prometheus labels"""
+    labels = dict(labels, **extra)
+    if not labels:
+        return ''
+    escaped = (
+        str(value).replace('\\', r'\\').replace('"', r'\"').replace(
+            '\n', r'\n')
+        for value in labels.values()
+    )
+
+    return '{' + ','.join(
+        f'{name}="{value}"' for name, value in zip(labels, escaped)
+    ) + '}'
+
+
+def _number(value):
+    """Format a value, without a fraction for whole numbers"""
+    return repr(int(value)) if float(value).is_integer() else repr(value)
+
+
+def render(counters, histograms):
+    """Return metrics in the Prometheus text exposition format"""
+    # the hit ratio of each cache, derived from its lookups
+    lookups = defaultdict(lambda: [0.0, 0.0])
+    for (name, labels), value in counters.items():
+        if name == 'cache_requests_total':
+            labels = dict(labels)
+            lookups[labels['cache']][labels['result'] == 'hit'] += value
+
+    families = defaultdict(list)
+    for (name, labels), value in sorted(counters.items()):
+        families[name, 'counter'].append(f'{name}{_labels(labels)} '
+                                         f'{_number(value)}')
+    for cache, (misses, hits) in sorted(lookups.items()):
+        families['cache_hit_ratio', 'gauge'].append(
+            f'cache_hit_ratio{_labels({"cache": cache})} '
+            f'{_number(round(hits / (hits + misses), 4))}'
+        )
+    for (name, labels), counts in sorted(histograms.items()):
+        lines = families[name, 'histogram']
+        cumulative = 0
+        for bound, count in zip(HISTOGRAM_BUCKETS[name] + ('+Inf',),
+                                counts):
+            cumulative += count
+            lines.append(
+                f'{name}_bucket{_labels(labels, le=bound)} {cumulative}')
+        lines.append(f'{name}_sum{_labels(labels)} {_number(counts[-1])}')
+        lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+
+    output = []
+    for (name, kind), lines in families.items():
+        output.append(f'# HELP {name} {DESCRIPTIONS[name]}')
+        output.append(f'# TYPE {name} {kind}')
+        output.extend(lines)
+
+    return '\n'.join(output) + '\n'
+
+
+class MetricsMiddleware:
+    """Count requests, their latency and queries by URL name"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryTimer()
+        start = time.perf_counter()
+        with wrap_connections(queries):
+            response = self.get_response(request)
+        seconds = time.perf_counter() - start
+
+        match = request.resolver_match
+        labels = {
+            'view': match.view_name if match else 'unmatched',
+            'method': request.method,
+            'status': str(response.status_code),
+        }
+        registry.inc('http_requests_total', labels)
+        registry.observe('http_request_duration_seconds', labels, seconds)
+        labels = {'view': labels['view'], 'method': request.method}
+        registry.inc('db_queries_total', labels, queries.count)
+        registry.inc(
+            'db_query_duration_seconds_total', labels, queries.seconds)
+
+        return response
+
+
+def metrics_view(request):
+    """Return the metrics of every process for Prometheus to scrape"""
+    # scrapers send settings.METRICS_TOKEN as a bearer token, without one
+    # configured the metrics are not served at all
+    token = settings.METRICS_TOKEN
+    given = request.META.get('HTTP_AUTHORIZATION', '')
+    if not token or not hmac.compare_digest(
+            given.encode(), f'Bearer {token}'.encode()):
+        return HttpResponseForbidden()
+
+    return HttpResponse(
+        render(*registry.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -0,0 +1,54 @@
+# Generated by Django 3.0.8 on 2026-10-18 11:40
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_CONFIG = 'pg_catalog.english'
+
+
+def create_search_index(apps, schema_editor):
+    """Index recipe names for full text search on postgres"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute(
+        'CREATE INDEX core_recipe_search_vector_gin '
+        'ON core_recipe USING gin (search_vector)'
+    )
+    schema_editor.execute(
+        'CREATE TRIGGER core_recipe_search_vector_update '
+        'BEFORE INSERT OR UPDATE OF name ON core_recipe '
+        'FOR EACH ROW EXECUTE PROCEDURE '
+        f"tsvector_update_trigger(search_vector, '{SEARCH_CONFIG}', name)"
+    )
+    schema_editor.execute(
+        'UPDATE core_recipe '
+        f"SET search_vector = to_tsvector('{SEARCH_CONFIG}', name)"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute(
+        'DROP TRIGGER IF EXISTS core_recipe_search_vector_update '
+        'ON core_recipe'
+    )
+    schema_editor.execute('DROP INDEX IF EXISTS core_recipe_search_vector_gin')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
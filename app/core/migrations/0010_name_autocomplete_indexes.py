@@ -0,0 +1,48 @@
+# Generated by Django 3.0.8 on 2026-10-18 13:05
+
+from django.db import migrations
+
+AUTOCOMPLETE_TABLES = ('core_tag', 'core_ingredient')
+
+
+def create_autocomplete_indexes(apps, schema_editor):
+    """Index tag and ingredient names per user for prefix and fuzzy lookup"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # lets the trigram GIN index lead with the user column
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gin')
+    for table in AUTOCOMPLETE_TABLES:
+        # matches the UPPER(name::text) LIKE of istartswith lookups
+        schema_editor.execute(
+            f'CREATE INDEX {table}_user_name_prefix ON {table} '
+            '(user_id, UPPER(name::text) text_pattern_ops)'
+        )
+        schema_editor.execute(
+            f'CREATE INDEX {table}_user_name_trgm ON {table} '
+            'USING gin (user_id, name gin_trgm_ops)'
+        )
+
+
+def drop_autocomplete_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    for table in AUTOCOMPLETE_TABLES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {table}_user_name_prefix')
+        schema_editor.execute(f'DROP INDEX IF EXISTS {table}_user_name_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            create_autocomplete_indexes,
+            drop_autocomplete_indexes
+        ),
+    ]
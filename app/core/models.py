@@ -1,10 +1,13 @@
 import uuid
 import os
 from django.db import models
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager,  \
     PermissionsMixin
 from django.conf import settings
 
+from core.querycache import CachedManager
+
 
 def recipe_image_file_path(instance, filename):
     """Generate file path for new recipe image"""
@@ -60,6 +63,22 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    updated_at = models.DateTimeField(auto_now=True)
+    # number of recipes using the tag, kept up to date by core.signals
+    recipe_count = models.PositiveIntegerField(default=0, editable=False)
+
+    # opt in to the query cache with .cached(), see core.querycache
+    objects = CachedManager()
+
+    class Meta:
+        indexes = [
+            # serves the per user listing ordered by -name, -id
+            models.Index(fields=['user', 'name', 'id'],
+                         name='core_tag_user_name_idx'),
+            # serves ordering and filtering by usage
+            models.Index(fields=['user', 'recipe_count', 'id'],
+                         name='core_tag_user_usage_idx'),
+        ]
 
     # Adding the string representation of a model
     def __str__(self):
@@ -74,6 +93,18 @@ class Ingredient(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    updated_at = models.DateTimeField(auto_now=True)
+    recipe_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = CachedManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'name', 'id'],
+                         name='core_ingredient_user_name_idx'),
+            models.Index(fields=['user', 'recipe_count', 'id'],
+                         name='core_ingredient_user_usage_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -94,6 +125,46 @@ class Recipe(models.Model):
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    # also touched when tags or ingredients change, see core.signals
+    updated_at = models.DateTimeField(auto_now=True)
+    # postgres keeps this in sync with name through a trigger and indexes
+    # it with GIN, see migration 0009, other databases leave it empty
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = CachedManager()
+
+    class Meta:
+        indexes = [
+            # serves the per user listing ordered by -id
+            models.Index(fields=['user', 'id'],
+                         name='core_recipe_user_id_idx'),
+            # serve ?ordering=price and time_minutes with range filters
+            models.Index(fields=['user', 'price', 'id'],
+                         name='core_recipe_user_price_idx'),
+            models.Index(fields=['user', 'time_minutes', 'id'],
+                         name='core_recipe_user_time_idx'),
+        ]
 
     def __str__(self):
         return self.name
+
+
+class ImportCheckpoint(models.Model):
+    """Records imported so far from a file, see the import_recipes command"""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    source = models.CharField(max_length=255)
+    # saved in the same transaction as each imported batch
+    position = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'source'],
+                                    name='core_importcheckpoint_unique'),
+        ]
+
+    def __str__(self):
+        return f'{self.source}: {self.position}'
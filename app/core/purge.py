@@ -0,0 +1,113 @@
+import threading
+
+from django.contrib.auth import get_user_model
+from django.db import connections, transaction
+
+from core.models import Tag, Ingredient, Recipe
+from core.signals import recount_usage
+from core.versions import invalidate
+
+# rows deleted per statement and transaction when purging an account
+PURGE_CHUNK_SIZE = 1000
+
+
+def _raw_delete(queryset):
+    """Delete rows with a single DELETE, skipping the deletion collector"""
+    # the collector loads every row and its relations into memory first,
+    # callers remove dependent rows themselves in dependency order
+    return queryset._raw_delete(queryset.db)
+
+
+def _links(field):
+    """Return the m2m table of a recipe field and its related column"""
+    model_field = Recipe._meta.get_field(field)
+
+    return (
+        model_field.remote_field.through,
+        f'{model_field.m2m_reverse_field_name()}_id',
+    )
+
+
+def _delete_files(names):
+    """Delete stored recipe images, once their rows are gone for good"""
+    storage = Recipe._meta.get_field('image').storage
+    for name in names:
+        storage.delete(name)
+
+
+def delete_recipes(user_id, ids, recount=True):
+    """Delete recipes and their links with set based DELETE statements"""
+    recipes = Recipe._base_manager.filter(user_id=user_id, pk__in=ids)
+    images = [
+        name for name in recipes.values_list('image', flat=True) if name
+    ]
+    with transaction.atomic():
+        for model, field in ((Tag, 'tags'), (Ingredient, 'ingredients')):
+            through, column = _links(field)
+            rows = through.objects.filter(recipe_id__in=ids)
+            related_ids = set()
+            if recount:
+                related_ids = set(rows.values_list(column, flat=True))
+            _raw_delete(rows)
+            if related_ids:
+                recount_usage(model, related_ids)
+        deleted = _raw_delete(recipes)
+        invalidate(Recipe, [user_id])
+        # a rolled back delete must keep its files
+        transaction.on_commit(lambda: _delete_files(images))
+
+    return deleted
+
+
+def _delete_in_chunks(queryset, delete, chunk_size):
+    """Call delete on chunks of ids from a queryset until none are left"""
+    while True:
+        with transaction.atomic():
+            ids = list(queryset.values_list('pk', flat=True)[:chunk_size])
+            if not ids:
+                return
+            delete(ids)
+
+
+def purge_user(user_id, chunk_size=PURGE_CHUNK_SIZE):
+    """Delete a user and everything they own, chunk by chunk"""
+    # short transactions in dependency order keep locks brief: the links,
+    # the recipes, then tags and ingredients and finally the user
+    _delete_in_chunks(
+        Recipe._base_manager.filter(user_id=user_id),
+        lambda ids: delete_recipes(user_id, ids, recount=False),
+        chunk_size
+    )
+
+    for model, field in ((Tag, 'tags'), (Ingredient, 'ingredients')):
+        through, column = _links(field)
+
+        def delete(ids, model=model, through=through, column=column):
+            _raw_delete(through.objects.filter(**{f'{column}__in': ids}))
+            _raw_delete(model._base_manager.filter(pk__in=ids))
+
+        _delete_in_chunks(
+            model._base_manager.filter(user_id=user_id),
+            delete,
+            chunk_size
+        )
+
+    with transaction.atomic():
+        # the remaining relations, e.g. the auth token, are small
+        get_user_model()._base_manager.filter(pk=user_id).delete()
+        for model in (Tag, Ingredient, Recipe):
+            invalidate(model, [user_id])
+
+
+def purge_user_in_background(user_id, chunk_size=PURGE_CHUNK_SIZE):
+    """Purge a user from a thread started once the transaction commits"""
+    def run():
+        try:
+            purge_user(user_id, chunk_size)
+        finally:
+            connections.close_all()
+
+    thread = threading.Thread(target=run, name=f'purge-user-{user_id}')
+    transaction.on_commit(thread.start)
+
+    return thread
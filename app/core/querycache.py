@@ -0,0 +1,219 @@
+import functools
+import hashlib
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import EmptyResultSet
+from django.db import connections, models
+
+from core.metrics import record_cache
+from core.versions import get_versions, invalidate, model_tables, \
+    table_scope
+
+
+class LocalBackend:
+    """In-process cache of query results with LRU eviction"""
+
+    def __init__(self, max_entries, timeout):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires is not None and expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+
+        # every caller gets its own copy of the cached objects
+        return pickle.loads(value)
+
+    def set(self, key, value, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        expires = time.monotonic() + timeout if timeout else None
+        value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SharedBackend:
+    """Query results stored in a Django cache shared between processes"""
+    # size and LRU eviction come from the cache itself, e.g. MAX_ENTRIES
+    # on the locmem backend or the eviction policy of memcached
+
+    def __init__(self, alias, timeout):
+        self.cache = caches[alias]
+        self.timeout = timeout
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        self.cache.set(key, value, timeout)
+
+    def clear(self):
+        self.cache.clear()
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Return the backend configured in settings.QUERYSET_CACHE"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            options = settings.QUERYSET_CACHE
+            if options['BACKEND'] == 'shared':
+                _backend = SharedBackend(
+                    options['CACHE_ALIAS'],
+                    options['TIMEOUT']
+                )
+            else:
+                _backend = LocalBackend(
+                    options['MAX_ENTRIES'],
+                    options['TIMEOUT']
+                )
+
+    return _backend
+
+
+@functools.lru_cache(maxsize=None)
+def _all_tables():
+    return frozenset(
+        model._meta.db_table
+        for model in apps.get_models(include_auto_created=True)
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def tracked_tables():
+    """Return the tables whose changes bump versions, see core.signals"""
+    return frozenset(
+        table
+        for name in ('Tag', 'Ingredient', 'Recipe')
+        for table in model_tables(apps.get_model('core', name))
+    )
+
+
+def _tables_in(sql, connection):
+    """Return the names of all model tables referenced by some SQL"""
+    return {
+        table for table in _all_tables()
+        if connection.ops.quote_name(table) in sql
+    }
+
+
+def cache_key(queryset, user_id):
+    """Return the cache key for a queryset, or None if it is uncacheable"""
+    connection = connections[queryset.db]
+    try:
+        sql, params = queryset.query.clone().get_compiler(
+            using=queryset.db).as_sql()
+    except EmptyResultSet:
+        return None
+
+    tables = _tables_in(sql, connection)
+    # results from tables without version tracking could go stale
+    if not tables or not tables <= tracked_tables():
+        return None
+
+    versions = get_versions(*[
+        table_scope(table, user_id) for table in sorted(tables)
+    ])
+    normalized = re.sub(r'\s+', ' ', sql).strip()
+    # the same SQL can be turned into instances, dicts or tuples
+    shape = f'{queryset._iterable_class.__name__}:{queryset._fields}'
+    digest = hashlib.sha1('\n'.join((
+        queryset.db, normalized, repr(params), shape, repr(versions),
+    )).encode()).hexdigest()
+
+    return f'querycache:{user_id}:{digest}'
+
+
+class CachedQuerySet(models.QuerySet):
+    """QuerySet whose results can be served from the query cache"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cache_options = None
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._cache_options = self._cache_options
+        return clone
+
+    def cached(self, user=None, timeout=None):
+        """Cache the results, keyed per user when filtered by one user"""
+        # only pass a user when every row read belongs to that user,
+        # their changes alone then invalidate the results
+        clone = self._chain()
+        clone._cache_options = {
+            'user_id': getattr(user, 'pk', user),
+            'timeout': timeout,
+        }
+
+        return clone
+
+    def _fetch_all(self):
+        if self._result_cache is None and self._cache_options is not None:
+            backend = get_backend()
+            key = cache_key(self, self._cache_options['user_id'])
+            if key is not None:
+                results = backend.get(key)
+                record_cache('queryset', results is not None)
+                if results is None:
+                    results = list(self._iterable_class(self))
+                    backend.set(key, results, self._cache_options['timeout'])
+                self._result_cache = results
+
+        # prefetches are not cached and run against the cached rows
+        super()._fetch_all()
+
+    def update(self, **kwargs):
+        # updates skip model signals, so bump the owners' versions here
+        user_ids = list(
+            self.order_by().values_list('user_id', flat=True).distinct()
+        )
+        rows = super().update(**kwargs)
+        invalidate(self.model, user_ids, using=self.db)
+
+        return rows
+
+    update.alters_data = True
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        invalidate(self.model, [obj.user_id for obj in objs], using=self.db)
+
+        return objs
+
+    def bulk_update(self, objs, *args, **kwargs):
+        rows = super().bulk_update(objs, *args, **kwargs)
+        invalidate(self.model, [obj.user_id for obj in objs], using=self.db)
+
+        return rows
+
+
+CachedManager = models.Manager.from_queryset(CachedQuerySet)
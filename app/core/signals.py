@@ -0,0 +1,127 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_save, pre_delete, post_delete, \
+    m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import Tag, Ingredient, Recipe
+from core.versions import invalidate
+
+
+@receiver(post_save, sender=get_user_model())
+def user_saved(sender, instance, created, **kwargs):
+    """Start new users on fresh versions, in case ids are reused"""
+    if created:
+        for model in (Tag, Ingredient, Recipe):
+            invalidate(model, [instance.pk])
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+def user_object_changed(sender, instance, **kwargs):
+    """Invalidate cached data for the owner of a changed object"""
+    invalidate(sender, [instance.user_id])
+
+
+def adjust_usage(model, ids, delta):
+    """Add delta to the recipe_count of the tags or ingredients given"""
+    if ids:
+        model.objects.filter(pk__in=ids).update(
+            recipe_count=F('recipe_count') + delta
+        )
+
+
+def recount_usage(model, ids):
+    """Recount the recipe_count of tags or ingredients in one update"""
+    # for links written in bulk, which skip m2m_changed
+    relation = model._meta.get_field('recipe')
+    column = f'{relation.field.m2m_reverse_field_name()}_id'
+    counts = relation.through.objects.filter(
+        **{column: OuterRef('pk')}
+    ).order_by().values(column).annotate(count=Count('*')).values('count')
+
+    model.objects.filter(pk__in=ids).update(recipe_count=Coalesce(
+        Subquery(counts, output_field=IntegerField()), 0
+    ))
+
+
+def _linked_ids(through, related_model, recipe_ids):
+    """Return the tag or ingredient ids linked to recipes, once per link"""
+    column = f'{related_model._meta.model_name}_id'
+
+    return list(through.objects.filter(
+        recipe_id__in=recipe_ids).values_list(column, flat=True))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_relations_changed(sender, instance, action, reverse, model,
+                             pk_set, **kwargs):
+    """Keep modification times and usage counts in step with links"""
+    related_model = type(instance) if reverse else model
+    if action in ('pre_clear', 'pre_remove'):
+        # remember what is about to be unlinked, the clear signals do not
+        # say which objects were affected and the remove ones include
+        # objects that were never linked
+        if reverse:
+            links = sender.objects.filter(**{
+                f'{related_model._meta.model_name}_id': instance.pk
+            })
+            if pk_set is not None:
+                links = links.filter(recipe_id__in=pk_set)
+            instance._unlinked_recipe_ids = list(
+                links.values_list('recipe_id', flat=True))
+        else:
+            related_ids = _linked_ids(sender, related_model, [instance.pk])
+            if pk_set is not None:
+                related_ids = [pk for pk in related_ids if pk in pk_set]
+            instance._unlinked_related_ids = related_ids
+        return
+    if not action.startswith('post_'):
+        return
+
+    if action == 'post_add':
+        # add only reports the objects that were not linked yet
+        if reverse:
+            recipe_ids = pk_set
+            adjust_usage(related_model, [instance.pk], len(pk_set))
+        else:
+            recipe_ids = [instance.pk]
+            adjust_usage(related_model, pk_set, 1)
+    elif reverse:
+        recipe_ids = instance.__dict__.pop('_unlinked_recipe_ids', [])
+        adjust_usage(related_model, [instance.pk], -len(recipe_ids))
+    else:
+        recipe_ids = [instance.pk]
+        adjust_usage(
+            related_model,
+            instance.__dict__.pop('_unlinked_related_ids', []),
+            -1
+        )
+
+    # the base manager skips the query cache, invalidated just below
+    Recipe._base_manager.filter(pk__in=recipe_ids).update(
+        updated_at=timezone.now()
+    )
+
+    invalidate(Recipe, [instance.user_id])
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    """Stop counting a deleted recipe towards its tags and ingredients"""
+    # the cascade removes the links without sending m2m_changed
+    for field in ('tags', 'ingredients'):
+        through = Recipe._meta.get_field(field).remote_field.through
+        related_model = Recipe._meta.get_field(field).related_model
+        adjust_usage(
+            related_model,
+            _linked_ids(through, related_model, [instance.pk]),
+            -1
+        )
@@ -0,0 +1,152 @@
+import itertools
+import logging
+import random
+import re
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from core.timing import instrumentation_suspended, \
+    suspend_instrumentation, wrap_connections
+
+logger = logging.getLogger(__name__)
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize(sql):
+    """Return SQL with literals and placeholder lists collapsed"""
+    # queries differing only in their values or the length of an IN list,
+    # e.g. tags__id__in, end up as one statement
+    sql = _LITERALS.sub('?', sql.replace('%s', '?'))
+    sql = _PLACEHOLDER_LISTS.sub('(...)', sql)
+
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def param_shape(params):
+    """Describe the types of query parameters, e.g. 'int x 3, str'"""
+    if not params:
+        return ''
+    if isinstance(params, dict):
+        params = params.values()
+
+    return ', '.join(
+        name if count == 1 else f'{name} x {count}'
+        for name, count in (
+            (name, len(list(group)))
+            for name, group in itertools.groupby(
+                type(param).__name__ for param in params)
+        )
+    )
+
+
+class SlowQueryLog:
+    """The most recent slow queries of this process"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = deque(maxlen=settings.SLOW_QUERY_LOG_SIZE)
+
+    def record(self, entry):
+        """Add an entry, dropping the oldest once the log is full"""
+        with self.lock:
+            if self.entries.maxlen != settings.SLOW_QUERY_LOG_SIZE:
+                self.entries = deque(
+                    self.entries, maxlen=settings.SLOW_QUERY_LOG_SIZE)
+            self.entries.append(entry)
+
+    def recent(self):
+        """Return the entries, most recent first"""
+        with self.lock:
+            return list(reversed(self.entries))
+
+    def clear(self):
+        """Forget every entry"""
+        with self.lock:
+            self.entries.clear()
+
+
+slow_queries = SlowQueryLog()
+
+
+def explain(connection, sql, params):
+    """Return the plan of a query as executed, or None if it failed"""
+    if connection.vendor == 'postgresql':
+        prefix = 'EXPLAIN (ANALYZE, BUFFERS)'
+    else:
+        prefix = connection.ops.explain_query_prefix()
+
+    try:
+        # in a savepoint, as a failed EXPLAIN would otherwise break the
+        # transaction of the request, neither it nor the savepoint count
+        # towards the request's queries
+        with suspend_instrumentation(), \
+                transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(f'{prefix} {sql}', params)
+                rows = cursor.fetchall()
+    except DatabaseError:
+        logger.warning('Could not explain a slow query', exc_info=True)
+        return None
+
+    return '\n'.join(' '.join(str(column) for column in row) for row in rows)
+
+
+class SlowQueryRecorder:
+    """Execute wrapper logging the queries of a request over a threshold"""
+
+    def __init__(self, request):
+        self.request = request
+
+    def __call__(self, execute, sql, params, many, context):
+        if instrumentation_suspended():
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration = (time.perf_counter() - start) * 1000
+        if duration >= settings.SLOW_QUERY_THRESHOLD_MS:
+            self.record(sql, params, many, context['connection'], duration)
+
+        return result
+
+    def record(self, sql, params, many, connection, duration):
+        """Add a slow query to the log, with its plan for a sample"""
+        plan = None
+        # EXPLAIN ANALYZE runs the query again, so only reads are explained
+        if not many and sql.lstrip()[:6].upper() == 'SELECT' and \
+                random.random() < settings.SLOW_QUERY_EXPLAIN_RATE:
+            plan = explain(connection, sql, params)
+
+        match = self.request.resolver_match
+        slow_queries.record({
+            'time': timezone.now().isoformat(),
+            'duration_ms': round(duration, 3),
+            'view': match.view_name if match else None,
+            'method': self.request.method,
+            'sql': normalize(sql),
+            'params': 'executemany' if many else param_shape(params),
+            'database': connection.alias,
+            'explain': plan,
+        })
+
+
+class SlowQueryMiddleware:
+    """Log queries slower than SLOW_QUERY_THRESHOLD_MS, see slow_queries"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if settings.SLOW_QUERY_THRESHOLD_MS is None:
+            return self.get_response(request)
+
+        with wrap_connections(SlowQueryRecorder(request)):
+            return self.get_response(request)
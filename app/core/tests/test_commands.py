@@ -1,9 +1,17 @@
+import json
+import os
+import tempfile
+from io import StringIO
 from unittest.mock import patch
 
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
 from django.test import TestCase
 
+from core.models import Tag, Recipe
+
 
 class CommandTests(TestCase):
 
@@ -21,3 +29,138 @@ class CommandTests(TestCase):
             gi.side_effect = [OperationalError] * 5 + [True]
             call_command('wait_for_db')
             self.assertEqual(gi.call_count, 6)
+
+    def test_purge_user(self):
+        """Test purging a user account by email"""
+        get_user_model().objects.create_user('test@gmail.com', 'test123456')
+
+        call_command('purge_user', 'test@gmail.com', stdout=StringIO())
+
+        self.assertFalse(get_user_model().objects.exists())
+
+    def test_purge_unknown_user(self):
+        """Test purging an unknown email fails"""
+        with self.assertRaises(CommandError):
+            call_command('purge_user', 'nobody@gmail.com')
+
+
+class ImportRecipesTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'test123456'
+        )
+        self.records = [
+            {
+                'name': f'Recipe {i}',
+                'time_minutes': 10,
+                'price': '4.50',
+                'link': '',
+                'tags': ['Vegan', f'Tag {i % 2}'],
+                'ingredients': ['Tofu'],
+            }
+            for i in range(5)
+        ]
+
+    def write_file(self, text, suffix='.ndjson'):
+        """Write an import file, removed after the test"""
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(fd, 'w') as file:
+            file.write(text)
+        self.addCleanup(os.remove, path)
+
+        return path
+
+    def ndjson(self, records):
+        return ''.join(json.dumps(record) + '\n' for record in records)
+
+    def run_import(self, path, **options):
+        out = StringIO()
+        call_command(
+            'import_recipes', 'test@gmail.com', path, stdout=out, **options)
+
+        return out.getvalue()
+
+    def test_import_ndjson(self):
+        """Test importing recipes with their tags and ingredients"""
+        output = self.run_import(self.write_file(self.ndjson(self.records)))
+
+        self.assertIn('rows/s', output)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 5)
+        self.assertEqual(
+            sorted(Tag.objects.values_list('name', flat=True)),
+            ['Tag 0', 'Tag 1', 'Vegan']
+        )
+        self.assertEqual(Tag.objects.get(name='Vegan').recipe_count, 5)
+        recipe = Recipe.objects.get(name='Recipe 1')
+        self.assertEqual(
+            sorted(recipe.tags.values_list('name', flat=True)),
+            ['Tag 1', 'Vegan']
+        )
+
+    def test_import_csv(self):
+        """Test importing the CSV export format"""
+        text = (
+            'id,name,time_minutes,price,link,tags,ingredients\n'
+            '7,Soup,20,3.00,,"[""Warm""]",[]\n'
+        )
+
+        self.run_import(self.write_file(text, suffix='.csv'))
+
+        recipe = Recipe.objects.get()
+        self.assertEqual(recipe.name, 'Soup')
+        self.assertEqual(recipe.tags.get().name, 'Warm')
+
+    def test_import_resumes_after_failure(self):
+        """Test a failed import resumes after its last committed batch"""
+        records = list(self.records)
+        records[3] = dict(records[3], price='cheap')
+        path = self.write_file(self.ndjson(records))
+
+        with self.assertRaisesMessage(CommandError, 'Record 4'):
+            self.run_import(path, batch_size=2)
+        self.assertEqual(Recipe.objects.count(), 2)
+
+        with open(path, 'w') as file:
+            file.write(self.ndjson(self.records))
+        self.run_import(path, batch_size=2)
+
+        self.assertEqual(
+            list(Recipe.objects.order_by('id').values_list(
+                'name', flat=True)),
+            [f'Recipe {i}' for i in range(5)]
+        )
+
+    def test_import_invalid_records(self):
+        """Test records the recipe columns cannot hold fail the import"""
+        invalid = [
+            '[1, 2]',
+            json.dumps(dict(self.records[0], time_minutes=None)),
+            json.dumps(dict(self.records[0], time_minutes=[10])),
+            json.dumps(dict(self.records[0], price='NaN')),
+            json.dumps(dict(self.records[0], price='1000.00')),
+            json.dumps(dict(self.records[0], price='4.505')),
+            json.dumps(dict(self.records[0], name='x' * 256)),
+            json.dumps(dict(self.records[0], link='x' * 256)),
+            json.dumps(dict(self.records[0], tags=[' '])),
+        ]
+        for record in invalid:
+            with self.subTest(record=record[:50]):
+                path = self.write_file(record + '\n')
+
+                with self.assertRaisesMessage(CommandError, 'Record 1: '):
+                    self.run_import(path, restart=True)
+
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_import_restart(self):
+        """Test --restart imports a file again from the start"""
+        path = self.write_file(self.ndjson(self.records[:2]))
+        self.run_import(path)
+        self.run_import(path)
+        self.assertEqual(Recipe.objects.count(), 2)
+
+        self.run_import(path, restart=True)
+
+        self.assertEqual(Recipe.objects.count(), 4)
@@ -0,0 +1,124 @@
+import json
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.metrics import registry
+
+METRICS_URL = reverse('metrics')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+@override_settings(METRICS_TOKEN='scrape-token')
+class MetricsTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'test123456'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        registry.reset()
+
+    def metrics(self):
+        """Return the lines of the metrics endpoint"""
+        res = self.client.get(
+            METRICS_URL, HTTP_AUTHORIZATION='Bearer scrape-token')
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res['Content-Type'].startswith('text/plain'))
+
+        return res.content.decode().splitlines()
+
+    def test_requests_counted_by_view(self):
+        """Test requests are counted by URL name, method and status"""
+        self.client.get(RECIPES_URL)
+        self.client.get(RECIPES_URL)
+        self.client.post(RECIPES_URL, {})
+
+        lines = self.metrics()
+
+        self.assertIn(
+            'http_requests_total{method="GET",status="200",'
+            'view="recipe:recipe-list"} 2',
+            lines
+        )
+        self.assertIn(
+            'http_requests_total{method="POST",status="400",'
+            'view="recipe:recipe-list"} 1',
+            lines
+        )
+        self.assertIn(
+            'http_request_duration_seconds_count{method="GET",status="200",'
+            'view="recipe:recipe-list"} 2',
+            lines
+        )
+        self.assertIn(
+            'http_request_duration_seconds_bucket{method="GET",status="200",'
+            'view="recipe:recipe-list",le="+Inf"} 2',
+            lines
+        )
+        self.assertTrue(any(
+            line.startswith(
+                'db_queries_total{method="GET",view="recipe:recipe-list"}')
+            for line in lines
+        ))
+
+    @override_settings(RESPONSE_CACHE=True)
+    def test_cache_hit_ratio(self):
+        """Test response cache lookups and their hit ratio are reported"""
+        self.client.get(RECIPES_URL)
+        self.client.get(RECIPES_URL)
+
+        lines = self.metrics()
+
+        self.assertIn(
+            'cache_requests_total{cache="response",result="hit"} 1', lines)
+        self.assertIn(
+            'cache_requests_total{cache="response",result="miss"} 1', lines)
+        self.assertIn('cache_hit_ratio{cache="response"} 0.5', lines)
+
+    def test_metrics_require_token(self):
+        """Test metrics are only served for the configured token"""
+        for authorization in ('', 'Bearer wrong', 'scrape-token'):
+            res = self.client.get(
+                METRICS_URL, HTTP_AUTHORIZATION=authorization)
+
+            self.assertEqual(res.status_code, 403)
+
+    @override_settings(METRICS_TOKEN=None)
+    def test_metrics_disabled_without_token(self):
+        """Test metrics are not served when no token is configured"""
+        res = self.client.get(METRICS_URL, HTTP_AUTHORIZATION='Bearer ')
+
+        self.assertEqual(res.status_code, 403)
+
+    def test_processes_added_up(self):
+        """Test the metrics files of every process are added up"""
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(METRICS_DIR=directory):
+            self.client.get(RECIPES_URL)
+            # the file another worker process left behind
+            with open(os.path.join(directory, '1-1.json'), 'w') as file:
+                json.dump({
+                    'counters': [[
+                        'http_requests_total',
+                        {'method': 'GET', 'status': '200',
+                         'view': 'recipe:recipe-list'},
+                        4,
+                    ]],
+                    'histograms': [],
+                }, file)
+
+            lines = self.metrics()
+
+            self.assertEqual(len(os.listdir(directory)), 2)
+        self.assertIn(
+            'http_requests_total{method="GET",status="200",'
+            'view="recipe:recipe-list"} 5',
+            lines
+        )
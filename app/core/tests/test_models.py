@@ -77,6 +77,94 @@ class ModelTests(TestCase):
 
         self.assertEqual(str(recipe), recipe.name)
 
+    def test_recipe_touched_by_tag_change(self):
+        """Test adding a tag updates the recipe modification time"""
+        user = sample_user()
+        recipe = models.Recipe.objects.create(
+            user=user,
+            name='Beef Chow Fun',
+            time_minutes=30,
+            price=18.00
+        )
+        created = recipe.updated_at
+
+        recipe.tags.add(models.Tag.objects.create(user=user, name='Noodles'))
+        recipe.refresh_from_db()
+
+        self.assertGreater(recipe.updated_at, created)
+
+    def test_tag_recipe_count_maintained(self):
+        """Test the tag usage count follows links to recipes"""
+        user = sample_user()
+        tag = models.Tag.objects.create(user=user, name='Vegan')
+        recipes = [
+            models.Recipe.objects.create(
+                user=user, name=name, time_minutes=5, price=5.00
+            )
+            for name in ('Salad', 'Soup', 'Stew')
+        ]
+
+        for recipe in recipes:
+            recipe.tags.add(tag)
+        tag.refresh_from_db()
+        self.assertEqual(tag.recipe_count, 3)
+
+        recipes[0].tags.remove(tag)
+        recipes[1].tags.clear()
+        tag.refresh_from_db()
+        self.assertEqual(tag.recipe_count, 1)
+
+        recipes[2].delete()
+        tag.refresh_from_db()
+        self.assertEqual(tag.recipe_count, 0)
+
+    def test_ingredient_recipe_count_reverse_changes(self):
+        """Test the usage count follows changes made from the ingredient"""
+        user = sample_user()
+        ingredient = models.Ingredient.objects.create(user=user, name='Salt')
+        recipes = [
+            models.Recipe.objects.create(
+                user=user, name=name, time_minutes=5, price=5.00
+            )
+            for name in ('Chips', 'Bread')
+        ]
+
+        ingredient.recipe_set.add(*recipes)
+        ingredient.refresh_from_db()
+        self.assertEqual(ingredient.recipe_count, 2)
+
+        ingredient.recipe_set.clear()
+        ingredient.refresh_from_db()
+        self.assertEqual(ingredient.recipe_count, 0)
+
+    def test_recipe_count_ignores_removing_unlinked(self):
+        """Test removing objects that were never linked keeps the counts"""
+        user = sample_user()
+        tag = models.Tag.objects.create(user=user, name='Vegan')
+        other = models.Tag.objects.create(user=user, name='Quick')
+        recipes = [
+            models.Recipe.objects.create(
+                user=user, name=name, time_minutes=5, price=5.00
+            )
+            for name in ('Salad', 'Soup')
+        ]
+        recipes[0].tags.add(tag)
+
+        recipes[0].tags.remove(tag, other)
+        recipes[1].tags.remove(tag)
+        tag.recipe_set.remove(*recipes)
+        tag.refresh_from_db()
+        other.refresh_from_db()
+
+        self.assertEqual(tag.recipe_count, 0)
+        self.assertEqual(other.recipe_count, 0)
+
+        tag.recipe_set.add(recipes[0])
+        tag.recipe_set.remove(*recipes)
+        tag.refresh_from_db()
+
+        self.assertEqual(tag.recipe_count, 0)
+
     @patch('uuid.uuid4')
     def test_recipe_file_name_uuid(self, mock_uuid):
         """Test that the image is saved in the correct location"""
@@ -0,0 +1,107 @@
+import tempfile
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core import purge
+from core.models import Tag, Ingredient, Recipe
+
+
+def create_recipes(user, count):
+    """Create recipes sharing one tag and one ingredient"""
+    tag = Tag.objects.create(user=user, name='Vegan')
+    ingredient = Ingredient.objects.create(user=user, name='Tofu')
+    recipes = []
+    for i in range(count):
+        recipe = Recipe.objects.create(
+            user=user, name=f'Recipe {i}', time_minutes=5, price=5.00
+        )
+        recipe.tags.add(tag)
+        recipe.ingredients.add(ingredient)
+        recipes.append(recipe)
+
+    return recipes
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+@patch('core.purge.transaction.on_commit', lambda func, using=None: func())
+class PurgeTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'test123456'
+        )
+        self.other = get_user_model().objects.create_user(
+            'other@gmail.com',
+            'test123456'
+        )
+
+    def test_delete_recipes(self):
+        """Test deleting recipes removes their links and usage counts"""
+        recipes = create_recipes(self.user, 3)
+
+        deleted = purge.delete_recipes(
+            self.user.pk, [recipes[0].pk, recipes[1].pk])
+
+        self.assertEqual(deleted, 2)
+        self.assertEqual(
+            list(Recipe.objects.values_list('pk', flat=True)),
+            [recipes[2].pk]
+        )
+        tag = Tag.objects.get()
+        self.assertEqual(tag.recipe_count, 1)
+        self.assertEqual(Recipe.tags.through.objects.count(), 1)
+
+    def test_delete_recipes_of_owner_only(self):
+        """Test recipe ids of other users are left alone"""
+        recipe = create_recipes(self.other, 1)[0]
+
+        deleted = purge.delete_recipes(self.user.pk, [recipe.pk])
+
+        self.assertEqual(deleted, 0)
+        self.assertTrue(Recipe.objects.filter(pk=recipe.pk).exists())
+
+    def test_delete_recipes_removes_images(self):
+        """Test recipe images are deleted along with the recipe"""
+        recipe = create_recipes(self.user, 1)[0]
+        recipe.image.save('food.jpg', ContentFile(b'image'))
+        storage = recipe.image.storage
+        name = recipe.image.name
+        self.assertTrue(storage.exists(name))
+
+        purge.delete_recipes(self.user.pk, [recipe.pk])
+
+        self.assertFalse(storage.exists(name))
+
+    def test_purge_user(self):
+        """Test purging a user deletes their data and no one else's"""
+        create_recipes(self.user, 5)
+        kept = create_recipes(self.other, 2)
+
+        purge.purge_user(self.user.pk, chunk_size=2)
+
+        self.assertFalse(
+            get_user_model().objects.filter(pk=self.user.pk).exists())
+        self.assertEqual(
+            set(Recipe.objects.values_list('pk', flat=True)),
+            {recipe.pk for recipe in kept}
+        )
+        self.assertEqual(Tag.objects.get().user, self.other)
+        self.assertEqual(Ingredient.objects.get().user, self.other)
+        self.assertEqual(Recipe.tags.through.objects.count(), 2)
+
+    def test_purge_user_queries_per_chunk(self):
+        """Test purging runs queries per chunk rather than per row"""
+        counts = []
+        for user, size in ((self.user, 2), (self.other, 30)):
+            create_recipes(user, size)
+            with CaptureQueriesContext(connection) as context:
+                purge.purge_user(user.pk, chunk_size=100)
+            counts.append(len(context.captured_queries))
+
+        self.assertEqual(counts[0], counts[1])
@@ -0,0 +1,170 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+
+from core.models import Tag, Recipe
+from core.querycache import LocalBackend, SharedBackend, cache_key, \
+    get_backend
+
+
+def sample_user(email='test@gmail.com', password='test123456'):
+    """Create a sample user"""
+    return get_user_model().objects.create_user(email, password)
+
+
+class LocalBackendTests(TestCase):
+
+    def test_least_recently_used_evicted(self):
+        """Test the least recently used entry is evicted when full"""
+        backend = LocalBackend(max_entries=2, timeout=60)
+        backend.set('a', [1])
+        backend.set('b', [2])
+        backend.get('a')
+        backend.set('c', [3])
+
+        self.assertEqual(backend.get('a'), [1])
+        self.assertIsNone(backend.get('b'))
+        self.assertEqual(backend.get('c'), [3])
+
+    def test_entries_expire(self):
+        """Test entries are not returned after their timeout"""
+        backend = LocalBackend(max_entries=2, timeout=60)
+        backend.set('a', [1], timeout=-1)
+
+        self.assertIsNone(backend.get('a'))
+
+    def test_results_are_copies(self):
+        """Test changing returned results does not change the cache"""
+        backend = LocalBackend(max_entries=2, timeout=60)
+        backend.set('a', [1])
+        backend.get('a').append(2)
+
+        self.assertEqual(backend.get('a'), [1])
+
+
+class SharedBackendTests(TestCase):
+
+    def test_stores_in_cache_alias(self):
+        """Test the shared backend reads and writes the cache alias"""
+        backend = SharedBackend('querycache', timeout=60)
+        backend.set('key', [1, 2])
+
+        self.assertEqual(caches['querycache'].get('key'), [1, 2])
+        self.assertEqual(backend.get('key'), [1, 2])
+
+
+class CachedQuerySetTests(TestCase):
+
+    def setUp(self):
+        get_backend().clear()
+        self.user = sample_user()
+        self.tag = Tag.objects.create(user=self.user, name='Breakfast')
+
+    def tags(self):
+        return Tag.objects.filter(user=self.user).order_by('name')
+
+    def test_repeated_query_cached(self):
+        """Test a repeated cached query does not hit the database"""
+        list(self.tags().cached(user=self.user))
+
+        with self.assertNumQueries(0):
+            tags = list(self.tags().cached(user=self.user))
+
+        self.assertEqual(tags, [self.tag])
+
+    def test_uncached_by_default(self):
+        """Test querysets only use the cache when asked to"""
+        list(self.tags().cached(user=self.user))
+
+        with self.assertNumQueries(1):
+            list(self.tags())
+
+    def test_values_cached_separately(self):
+        """Test values and instances of the same query do not collide"""
+        list(self.tags().cached(user=self.user))
+
+        values = list(self.tags().cached(user=self.user).values('name'))
+
+        self.assertEqual(values, [{'name': 'Breakfast'}])
+
+    def test_save_invalidates(self):
+        """Test saving an object invalidates the owner's cached queries"""
+        list(self.tags().cached(user=self.user))
+
+        Tag.objects.create(user=self.user, name='Lunch')
+
+        self.assertEqual(len(self.tags().cached(user=self.user)), 2)
+
+    def test_other_user_change_keeps_cache(self):
+        """Test another user's changes leave per user results cached"""
+        list(self.tags().cached(user=self.user))
+
+        Tag.objects.create(user=sample_user('test1@gmail.com'), name='Lunch')
+
+        with self.assertNumQueries(0):
+            list(self.tags().cached(user=self.user))
+
+    def test_other_user_change_invalidates_unscoped(self):
+        """Test any change invalidates results not scoped to a user"""
+        list(Tag.objects.order_by('name').cached())
+
+        Tag.objects.create(user=sample_user('test1@gmail.com'), name='Lunch')
+
+        self.assertEqual(len(Tag.objects.order_by('name').cached()), 2)
+
+    def test_m2m_change_invalidates(self):
+        """Test adding a tag to a recipe invalidates tag filters"""
+        recipe = Recipe.objects.create(
+            user=self.user, name='Pancakes', time_minutes=5, price=3
+        )
+        recipes = Recipe.objects.filter(user=self.user, tags=self.tag)
+        self.assertEqual(len(recipes.cached(user=self.user)), 0)
+
+        recipe.tags.add(self.tag)
+
+        self.assertEqual(len(recipes.cached(user=self.user)), 1)
+
+    def test_update_invalidates(self):
+        """Test queryset updates invalidate cached queries"""
+        list(self.tags().cached(user=self.user))
+
+        Tag.objects.filter(user=self.user).update(name='Brunch')
+
+        self.assertEqual(
+            self.tags().cached(user=self.user)[0].name,
+            'Brunch'
+        )
+
+    def test_untracked_tables_not_cached(self):
+        """Test queries reading unversioned tables skip the cache"""
+        tags = Tag.objects.filter(user__email=self.user.email).cached()
+        list(tags)
+
+        with self.assertNumQueries(1):
+            list(Tag.objects.filter(user__email=self.user.email).cached())
+
+
+class CachedQuerySetCommitTests(TransactionTestCase):
+
+    def setUp(self):
+        get_backend().clear()
+        self.user = sample_user()
+        Tag.objects.create(user=self.user, name='Breakfast')
+
+    def tags(self):
+        return Tag.objects.filter(user=self.user).order_by('name')
+
+    def test_update_in_transaction_invalidates_after_commit(self):
+        """Test rows cached before an update commits are not served"""
+        stale = list(self.tags())
+        with transaction.atomic():
+            Tag.objects.filter(user=self.user).update(name='Brunch')
+            # a concurrent reader still sees the committed rows and caches
+            # them under the version bumped by the update
+            get_backend().set(
+                cache_key(self.tags(), self.user.pk), stale, None)
+
+        tags = list(self.tags().cached(user=self.user))
+
+        self.assertEqual(tags[0].name, 'Brunch')
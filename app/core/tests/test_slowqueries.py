@@ -0,0 +1,138 @@
+import re
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.metrics import registry
+from core.models import Tag, Recipe
+from core.querycache import get_backend
+from core.slowqueries import normalize, param_shape, slow_queries
+
+SLOW_QUERIES_URL = reverse('slow-queries')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class NormalizeTests(TestCase):
+
+    def test_normalize_sql(self):
+        """Test values and IN lists are collapsed"""
+        sql = normalize(
+            'SELECT "t1"."id" FROM "core_recipe" t1\n'
+            "WHERE t1.id IN (%s, %s, %s) AND name = 'Curry' LIMIT 21"
+        )
+
+        self.assertEqual(
+            sql,
+            'SELECT "t1"."id" FROM "core_recipe" t1 '
+            'WHERE t1.id IN (...) AND name = ? LIMIT ?'
+        )
+
+    def test_param_shape(self):
+        """Test parameters are described by their types"""
+        self.assertEqual(
+            param_shape([1, 2, 3, 'Curry', Decimal('5.00')]),
+            'int x 3, str, Decimal'
+        )
+        self.assertEqual(param_shape(None), '')
+
+
+@override_settings(SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_EXPLAIN_RATE=1)
+class SlowQueryLogTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'test123456'
+        )
+        self.staff = get_user_model().objects.create_user(
+            'staff@gmail.com',
+            'test123456',
+            is_staff=True
+        )
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = Recipe.objects.create(
+            user=self.user, name='Curry', time_minutes=20, price=7.00)
+        recipe.tags.add(tag)
+        self.tag = tag
+        self.client = APIClient()
+        slow_queries.clear()
+
+    def slow_queries(self):
+        """Return the slow query log as seen by a staff user"""
+        self.client.force_authenticate(self.staff)
+        res = self.client.get(SLOW_QUERIES_URL)
+        self.assertEqual(res.status_code, 200)
+
+        return res.data
+
+    def test_slow_queries_recorded(self):
+        """Test queries over the threshold are logged with their view"""
+        self.client.force_authenticate(self.user)
+        self.client.get(RECIPES_URL, {'tags': f'{self.tag.id}'})
+
+        entries = self.slow_queries()
+
+        recipe_queries = [
+            entry for entry in entries
+            if entry['view'] == 'recipe:recipe-list'
+            and 'FROM "core_recipe"' in entry['sql']
+        ]
+        self.assertTrue(recipe_queries)
+        entry = recipe_queries[0]
+        self.assertEqual(entry['method'], 'GET')
+        self.assertNotIn('%s', entry['sql'])
+        self.assertIn('int', entry['params'])
+        self.assertTrue(entry['explain'])
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=1)
+    def test_explain_not_counted(self):
+        """Test captured plans are left out of the request's query counts"""
+        self.client.force_authenticate(self.user)
+        counts = []
+        for threshold in (None, 0):
+            cache.clear()
+            get_backend().clear()
+            registry.reset()
+            with override_settings(SLOW_QUERY_THRESHOLD_MS=threshold), \
+                    self.assertLogs('core.timing', 'INFO'):
+                res = self.client.get(RECIPES_URL)
+            counts.append((
+                re.search(r'(\d+) queries', res['Server-Timing']).group(1),
+                registry.counters['db_queries_total', (
+                    ('method', 'GET'), ('view', 'recipe:recipe-list'))],
+            ))
+
+        self.assertTrue(slow_queries.recent()[0]['explain'])
+        self.assertEqual(counts[0], counts[1])
+
+    @override_settings(SLOW_QUERY_LOG_SIZE=2)
+    def test_slow_query_log_bounded(self):
+        """Test only the most recent slow queries are kept"""
+        self.client.force_authenticate(self.user)
+        self.client.get(RECIPES_URL)
+        self.client.get(reverse('recipe:tag-list'))
+
+        entries = self.slow_queries()
+
+        self.assertEqual(len(entries), 2)
+        self.assertEqual(entries[0]['view'], 'recipe:tag-list')
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=None)
+    def test_slow_query_log_disabled(self):
+        """Test nothing is logged without a threshold"""
+        self.client.force_authenticate(self.user)
+        self.client.get(RECIPES_URL)
+
+        self.assertEqual(slow_queries.recent(), [])
+
+    def test_slow_queries_staff_only(self):
+        """Test users who are not staff cannot read the slow query log"""
+        self.client.force_authenticate(self.user)
+
+        res = self.client.get(SLOW_QUERIES_URL)
+
+        self.assertEqual(res.status_code, 403)
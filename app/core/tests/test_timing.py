@@ -0,0 +1,77 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def parse_server_timing(header):
+    """Return the durations and descriptions of a Server-Timing header"""
+    metrics = {}
+    for entry in header.split(', '):
+        name, *params = entry.split(';')
+        metrics[name] = dict(param.split('=', 1) for param in params)
+
+    return metrics
+
+
+class ServerTimingTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'test123456'
+        )
+        Recipe.objects.create(
+            user=self.user, name='Curry', time_minutes=20, price=7.00)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=1)
+    def test_sampled_request_timed(self):
+        """Test a sampled request reports each phase and its queries"""
+        with self.assertLogs('core.timing', 'INFO') as logs, \
+                CaptureQueriesContext(connection) as queries:
+            res = self.client.get(RECIPES_URL)
+
+        metrics = parse_server_timing(res['Server-Timing'])
+        self.assertEqual(
+            list(metrics),
+            ['auth', 'serialize', 'render', 'db', 'total']
+        )
+        self.assertEqual(
+            metrics['db']['desc'], f'"{len(queries)} queries"')
+        self.assertGreaterEqual(
+            float(metrics['total']['dur']),
+            float(metrics['db']['dur'])
+        )
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual(entry['view'], 'recipe:recipe-list')
+        self.assertEqual(entry['status'], 200)
+        self.assertEqual(entry['queries'], len(queries))
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=1)
+    def test_failed_authentication_timed(self):
+        """Test requests rejected by authentication are still timed"""
+        with self.assertLogs('core.timing', 'INFO'):
+            res = APIClient().get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, 401)
+        metrics = parse_server_timing(res['Server-Timing'])
+        self.assertIn('auth', metrics)
+        self.assertNotIn('serialize', metrics)
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=0)
+    def test_unsampled_request_not_timed(self):
+        """Test requests outside the sample get no Server-Timing header"""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertFalse(res.has_header('Server-Timing'))
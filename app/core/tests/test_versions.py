@@ -0,0 +1,60 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+
+from core.models import Tag
+from core.versions import bump_version, get_last_modified, get_version, \
+    user_scope
+
+
+class VersionTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_versions_only_increase(self):
+        """Test every bump moves a scope to a greater version"""
+        first = get_version('test')
+        bump_version('test')
+        second = get_version('test')
+        bump_version('test')
+
+        self.assertGreater(second, first)
+        self.assertGreater(get_version('test'), second)
+
+    def test_lost_version_restarts(self):
+        """Test bumping a scope without a version gives it one"""
+        bump_version('test')
+
+        self.assertIsNotNone(cache.get('version:test'))
+
+    @patch('core.versions.time.time')
+    def test_last_modified_never_decreases(self, clock):
+        """Test a clock going backwards does not move Last-Modified back"""
+        clock.return_value = 2000.0
+        bump_version('test')
+        clock.return_value = 1000.0
+        bump_version('test')
+
+        self.assertEqual(get_last_modified('test'), 2000.0)
+
+
+class VersionCommitTests(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com', 'test123456')
+
+    def test_bumped_again_after_commit(self):
+        """Test a write bumps the version once more when it commits"""
+        scope = user_scope(self.user.pk)
+        with transaction.atomic():
+            Tag.objects.create(user=self.user, name='Vegan')
+            # what a concurrent reader would cache before the commit
+            during = get_version(scope)
+
+        self.assertGreater(get_version(scope), during)
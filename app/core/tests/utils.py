@@ -0,0 +1,65 @@
+import re
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """TestCase mixin for asserting an upper bound on SQL queries"""
+
+    @contextmanager
+    def assertQueryBudget(self, budget):
+        """Fail if the wrapped block runs more than `budget` queries"""
+        with CaptureQueriesContext(connection) as context:
+            yield context
+
+        executed = len(context.captured_queries)
+        if executed > budget:
+            queries = '\n'.join(
+                f'{i}. {query["sql"]}'
+                for i, query in enumerate(context.captured_queries, start=1)
+            )
+            self.fail(
+                f'{executed} queries executed, budget is {budget}\n'
+                f'Captured queries were:\n{queries}'
+            )
+
+
+# plan lines showing a table read without any index, per database vendor
+SEQUENTIAL_SCAN_PATTERNS = {
+    'postgresql': r'Seq Scan on (\w+)',
+    'sqlite': r'^SCAN (?:TABLE )?(\w+)(?!.*\bINDEX\b)(?!.*PRIMARY KEY)',
+}
+
+# plan lines showing rows sorted after they were read
+SORT_PATTERNS = {
+    'postgresql': r'^\s*(?:->\s*)?(?:Incremental )?Sort\b',
+    'sqlite': r'USE TEMP B-TREE FOR (?:RIGHT PART OF )?ORDER BY',
+}
+
+
+def explain(sql, using=connection):
+    """Return the plan lines of a query, see the limitation below"""
+    with using.cursor() as cursor:
+        if using.vendor == 'postgresql':
+            # sequential scans are discouraged, the small test tables would
+            # otherwise be scanned whatever indexes exist. A Seq Scan left
+            # in the plan therefore only means that no index can serve the
+            # query, not that the planner would prefer one on real data.
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            try:
+                cursor.execute(f'EXPLAIN {sql}')
+                return [row[0] for row in cursor.fetchall()]
+            finally:
+                cursor.execute('SET LOCAL enable_seqscan = on')
+
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def plan_matches(lines, patterns, using=connection):
+    """Return the plan lines matching the vendor's pattern"""
+    pattern = re.compile(patterns[using.vendor])
+
+    return [line for line in lines if pattern.search(line)]
@@ -0,0 +1,190 @@
+import contextvars
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# the timer of the request being handled, None when it is not sampled
+_current = contextvars.ContextVar('request_timer', default=None)
+# set while instrumentation runs queries of its own, e.g. to EXPLAIN a slow
+# query, which the request's query counts and timings leave out
+_suspended = contextvars.ContextVar('instrumentation', default=False)
+
+
+@contextmanager
+def suspend_instrumentation():
+    """Leave the queries run inside out of every execute wrapper's counts"""
+    token = _suspended.set(True)
+    try:
+        yield
+    finally:
+        _suspended.reset(token)
+
+
+def instrumentation_suspended():
+    """Return whether queries are currently left out of the counts"""
+    return _suspended.get()
+
+
+class QueryTimer:
+    """Database execute wrapper counting queries and the time they take"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        if _suspended.get():
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
+class RequestTimer:
+    """Time spent in each phase of a request, excluding database time"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = QueryTimer()
+        self.phases = {}
+        self._running = {}
+
+    def begin(self, name):
+        """Start timing a phase"""
+        self._running[name] = (time.perf_counter(), self.queries.seconds)
+
+    def end(self, name):
+        """Stop timing a phase, adding to any earlier time spent in it"""
+        if name not in self._running:
+            return
+        start, db_start = self._running.pop(name)
+        # queries run inside a phase count towards db only
+        seconds = time.perf_counter() - start - (
+            self.queries.seconds - db_start)
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def measure(self, name, func, *args, **kwargs):
+        """Call a function, timing it as a phase"""
+        self.begin(name)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.end(name)
+
+    def metrics(self):
+        """Return the phases, db and total durations in milliseconds"""
+        total = time.perf_counter() - self.start
+        metrics = {
+            name: round(seconds * 1000, 3)
+            for name, seconds in self.phases.items()
+        }
+        metrics['db'] = round(self.queries.seconds * 1000, 3)
+        metrics['total'] = round(total * 1000, 3)
+
+        return metrics
+
+
+@contextmanager
+def wrap_connections(wrapper):
+    """Install a database execute wrapper on every connection"""
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(wrapper))
+        yield
+
+
+def current():
+    """Return the timer of the current request if it is being timed"""
+    return _current.get()
+
+
+class ServerTimingMiddleware:
+    """Time a sample of requests, see SERVER_TIMING_SAMPLE_RATE"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # requests left out of the sample pay for one random number
+        if random.random() >= settings.SERVER_TIMING_SAMPLE_RATE:
+            return self.get_response(request)
+
+        timer = RequestTimer()
+        token = _current.set(timer)
+        try:
+            with wrap_connections(timer.queries):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        metrics = timer.metrics()
+        response['Server-Timing'] = ', '.join(
+            f'{name};dur={duration}'
+            + (f';desc="{timer.queries.count} queries"' if name == 'db'
+               else '')
+            for name, duration in metrics.items()
+        )
+        match = request.resolver_match
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'queries': timer.queries.count,
+            'timings_ms': metrics,
+        }, separators=(',', ':')))
+
+        return response
+
+
+class ServerTimingMixin:
+    """Time the auth, serialize and render phases of an API view"""
+    # serialize covers the handler, i.e. get_queryset, validation and the
+    # serializers, while the queries they run are reported as db
+
+    def perform_authentication(self, request):
+        timer = current()
+        if timer is None:
+            return super().perform_authentication(request)
+
+        return timer.measure(
+            'auth', super().perform_authentication, request)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        timer = current()
+        if timer is not None:
+            timer.begin('serialize')
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        timer = current()
+        if timer is None:
+            return super().finalize_response(
+                request, response, *args, **kwargs)
+
+        timer.end('serialize')
+        response = super().finalize_response(
+            request, response, *args, **kwargs)
+        renderer = getattr(response, 'accepted_renderer', None)
+        if renderer is not None:
+            # renderers are created for each request, so wrapping this one
+            # affects no other response
+            render = renderer.render
+
+            def timed_render(*args, **kwargs):
+                return timer.measure('render', render, *args, **kwargs)
+
+            renderer.render = timed_render
+
+        return response
@@ -0,0 +1,116 @@
+import time
+
+from django.core.cache import cache
+from django.db import connections, router, transaction
+
+
+def _key(scope):
+    return f'version:{scope}'
+
+
+def _modified_key(scope):
+    return f'modified:{scope}'
+
+
+def user_scope(user_id):
+    """Return the version scope covering everything a user owns"""
+    return f'user:{user_id}'
+
+
+def table_scope(table, user_id=None):
+    """Return the version scope of a table, or of one user's rows in it"""
+    if user_id is None:
+        return f'table:{table}'
+
+    return f'table:{table}:user:{user_id}'
+
+
+def model_tables(model):
+    """Return a model's table and the m2m tables linked to it"""
+    tables = [model._meta.db_table]
+    for field in model._meta.get_fields():
+        if field.many_to_many:
+            through = field.remote_field.through \
+                if field.concrete else field.through
+            tables.append(through._meta.db_table)
+
+    return tables
+
+
+def _now():
+    """Return the current time in microseconds"""
+    return time.time_ns() // 1000
+
+
+def get_versions(*scopes):
+    """Return the current versions of scopes, creating missing ones"""
+    keys = [_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        # a lost version restarts at the current time, so it can never
+        # repeat one that was handed out before
+        now = _now()
+        for key in missing:
+            cache.add(key, now, None)
+        versions = {key: now for key in missing}
+        versions.update(cache.get_many(keys))
+
+    return [versions[key] for key in keys]
+
+
+def get_version(scope):
+    """Return the current version of a scope, creating it if missing"""
+    return get_versions(scope)[0]
+
+
+def bump_version(*scopes):
+    """Move scopes to a new version, invalidating anything keyed on them"""
+    # versions are counters, incr is atomic and never goes backwards the
+    # way the clocks of different hosts can
+    for scope in scopes:
+        key = _key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # a lost version restarts at the current time, see get_versions
+            if not cache.add(key, _now(), None):
+                cache.incr(key)
+
+    # the wall clock time of the change, only ever moved forwards
+    keys = [_modified_key(scope) for scope in scopes]
+    now = time.time()
+    modified = cache.get_many(keys)
+    cache.set_many(
+        {key: max(now, modified.get(key, now)) for key in keys}, None
+    )
+
+
+def get_last_modified(scope):
+    """Return the unix timestamp of the last change to a scope"""
+    key = _modified_key(scope)
+    modified = cache.get(key)
+    if modified is None:
+        # unknown changes are treated as happening now
+        cache.add(key, time.time(), None)
+        modified = cache.get(key, time.time())
+
+    return modified
+
+
+def invalidate(model, user_ids, using=None):
+    """Bump the versions covering rows of a model owned by the given users"""
+    # bulk writes skip model signals, so they must call this themselves
+    tables = model_tables(model)
+    scopes = [table_scope(table) for table in tables]
+    for user_id in set(user_ids):
+        scopes.append(user_scope(user_id))
+        scopes.extend(table_scope(table, user_id) for table in tables)
+
+    bump_version(*scopes)
+    # readers between the bump and the commit still see the old rows and
+    # can cache them under the new version, bumping again once the write
+    # is visible retires those entries
+    using = using or router.db_for_write(model)
+    if connections[using].in_atomic_block:
+        transaction.on_commit(lambda: bump_version(*scopes), using=using)
@@ -0,0 +1,15 @@
+from rest_framework import authentication, permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.slowqueries import slow_queries
+
+
+class SlowQueryView(APIView):
+    """List the recent slow queries of the process answering the request"""
+    authentication_classes = (authentication.TokenAuthentication,
+                              authentication.SessionAuthentication)
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request):
+        return Response(slow_queries.recent())
@@ -0,0 +1,206 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.db.models import Prefetch
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Tag, Ingredient, Recipe
+from core.signals import recount_usage
+
+from recipe import filters
+from recipe.fastpath import ValuesPlan
+from recipe.pagination import RecipeCursorPagination
+from recipe.serializers import RecipeSerializer
+from recipe.views import RecipeViewSet
+
+
+def seed_recipes(count, tags=50, ingredients=200, links=3, seed=0):
+    """Create a benchmark user with randomly linked recipes"""
+    rng = random.Random(seed)
+    user = get_user_model().objects.create_user(
+        email=f'benchmark-{seed}@example.com',
+        password='benchmark',
+        name='Benchmark'
+    )
+
+    Tag.objects.bulk_create(
+        Tag(user=user, name=f'Tag {i}') for i in range(tags)
+    )
+    Ingredient.objects.bulk_create(
+        Ingredient(user=user, name=f'Ingredient {i}')
+        for i in range(ingredients)
+    )
+    Recipe.objects.bulk_create(
+        (
+            Recipe(
+                user=user,
+                name=f'Recipe {i}',
+                time_minutes=rng.randint(5, 240),
+                price=rng.randint(100, 99999) / 100,
+            )
+            for i in range(count)
+        ),
+        batch_size=500
+    )
+
+    # ids are re-read since not every database returns them on insert
+    recipe_ids = list(
+        Recipe.objects.filter(user=user).values_list('id', flat=True)
+    )
+    for model, through in ((Tag, Recipe.tags.through),
+                           (Ingredient, Recipe.ingredients.through)):
+        related_ids = list(
+            model.objects.filter(user=user).values_list('id', flat=True)
+        )
+        column = f'{model._meta.model_name}_id'
+        through.objects.bulk_create(
+            (
+                through(recipe_id=recipe_id, **{column: related_id})
+                for recipe_id in recipe_ids
+                for related_id in rng.sample(
+                    related_ids, min(links, len(related_ids)))
+            ),
+            batch_size=500
+        )
+        recount_usage(model, related_ids)
+
+    return user
+
+
+def measure(func, repeat):
+    """Call a function repeatedly, returning its last result and timings"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+
+    return result, timings
+
+
+def summarize(name, timings, **extra):
+    """Return a result row for a list of timings in seconds"""
+    return dict(
+        name=name,
+        best_ms=round(min(timings) * 1000, 3),
+        median_ms=round(statistics.median(timings) * 1000, 3),
+        **extra
+    )
+
+
+def benchmark_serializers(user, repeat):
+    """Compare RecipeSerializer against the values based list output"""
+    queryset = Recipe.objects.filter(user=user).order_by('-id')
+    renderer = JSONRenderer()
+
+    def model_serializer():
+        recipes = queryset.prefetch_related(*[
+            Prefetch(name, queryset=related)
+            for name, related in RecipeViewSet.related_querysets.items()
+        ])
+        return renderer.render(RecipeSerializer(recipes, many=True).data)
+
+    plan = ValuesPlan.for_serializer(RecipeSerializer())
+
+    def values_plan():
+        rows = list(plan.values(queryset))
+        return renderer.render(plan.serialize(rows, queryset.db))
+
+    expected, slow = measure(model_serializer, repeat)
+    actual, fast = measure(values_plan, repeat)
+    if actual != expected:
+        raise AssertionError('values based output differs from serializer')
+
+    return [
+        summarize('RecipeSerializer', slow, bytes=len(expected)),
+        summarize('ValuesPlan', fast, bytes=len(actual),
+                  speedup=round(min(slow) / min(fast), 2)),
+    ]
+
+
+def benchmark_filters(user, repeat):
+    """Time the tag filter match modes and capture their query plans"""
+    recipes = Recipe.objects.filter(user=user).order_by('-id')
+    tag_ids = list(
+        Tag.objects.filter(user=user).order_by('id').values_list(
+            'id', flat=True)
+    )
+    cases = [
+        ('any of 10 tags', filters.filter_related(
+            recipes, 'tags', tag_ids[:10], filters.MATCH_ANY)),
+        ('all of 2 tags', filters.filter_related(
+            recipes, 'tags', tag_ids[:2], filters.MATCH_ALL)),
+        ('all of 10 tags', filters.filter_related(
+            recipes, 'tags', tag_ids[:10], filters.MATCH_ALL)),
+        ('none of 10 tags', filters.exclude_related(
+            recipes, 'tags', tag_ids[:10])),
+    ]
+
+    results = []
+    for name, queryset in cases:
+        page = queryset.values_list('id', flat=True)[:100]
+        rows, timings = measure(lambda: list(page.all()), repeat)
+        plan = ' | '.join(
+            line.strip() for line in page.explain().splitlines()
+        )
+        results.append(summarize(name, timings, rows=len(rows), plan=plan))
+
+    return results
+
+
+def benchmark_orderings(user, repeat):
+    """Time first and deep pages of each recipe ordering, keyset vs offset"""
+    # run with --recipes 1000000 to see how deep pages behave at scale
+    recipes = Recipe.objects.filter(user=user)
+    depth = recipes.count() // 2
+    cases = [
+        (ordering, recipes) for ordering in RecipeViewSet.ordering_choices
+    ] + [
+        ('price 10-20', recipes.filter(price__gte=10, price__lte=20)),
+        ('time under 30', recipes.filter(time_minutes__lte=30)),
+    ]
+
+    results = []
+    for name, queryset in cases:
+        ordering = RecipeViewSet.ordering_choices.get(name, ('-id',))
+        fields = [field.lstrip('-') for field in ordering]
+        queryset = queryset.order_by(*ordering)
+        paginator = RecipeCursorPagination()
+        paginator.ordering = ordering
+
+        first = queryset.values_list('id', flat=True)[:100]
+        _, first_timings = measure(lambda: list(first.all()), repeat)
+
+        # the page half way through, found by position and by offset
+        middle = queryset.values(*fields)[depth:depth + 1]
+        row = middle[0] if middle else dict.fromkeys(fields, 0)
+        position = paginator._get_position_from_instance(row, ordering)
+        keyset = queryset.filter(
+            paginator.keyset_filter(position, False, queryset)
+        ).values_list('id', flat=True)[:100]
+        offset = queryset.values_list('id', flat=True)[depth:depth + 100]
+        _, keyset_timings = measure(lambda: list(keyset.all()), repeat)
+        _, offset_timings = measure(lambda: list(offset.all()), repeat)
+
+        plan = ' | '.join(
+            line.strip() for line in keyset.explain().splitlines()
+        )
+        results.append(summarize(
+            name, first_timings,
+            keyset_deep_ms=round(min(keyset_timings) * 1000, 3),
+            offset_deep_ms=round(min(offset_timings) * 1000, 3),
+            plan=plan,
+        ))
+
+    return results
+
+
+# scenarios run by the benchmark management command
+SCENARIOS = {
+    'serializers': benchmark_serializers,
+    'filters': benchmark_filters,
+    'orderings': benchmark_orderings,
+}
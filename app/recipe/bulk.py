@@ -0,0 +1,143 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from core.bulk import insert_with_ids
+from core.models import Recipe
+from core.signals import recount_usage
+from core.versions import invalidate
+
+# relations written through their m2m tables instead of .set()
+RELATED_FIELDS = ('tags', 'ingredients')
+
+# rows per INSERT statement for the m2m tables
+THROUGH_BATCH_SIZE = 500
+
+
+def resolve_names(user, items):
+    """Replace tag and ingredient names in validated data with objects"""
+    # per relation, one query finds the named objects and one bulk insert
+    # creates the missing ones
+    for field in RELATED_FIELDS:
+        names = {
+            value for item in items for value in item.get(field, ())
+            if isinstance(value, str)
+        }
+        if not names:
+            continue
+
+        model = Recipe._meta.get_field(field).related_model
+        with transaction.atomic():
+            # writers for the same user queue on their row, so two requests
+            # cannot both create a missing name
+            list(get_user_model()._base_manager.select_for_update().filter(
+                pk=user.pk).values_list('pk', flat=True))
+            found = {}
+            for obj in model.objects.filter(
+                    user=user, name__in=names).order_by('id'):
+                found.setdefault(obj.name, obj)
+            missing = [
+                model(user=user, name=name)
+                for name in sorted(names - set(found))
+            ]
+            insert_with_ids(model, missing)
+            found.update((obj.name, obj) for obj in missing)
+
+        for item in items:
+            if field in item:
+                item[field] = [
+                    found[value] if isinstance(value, str) else value
+                    for value in item[field]
+                ]
+
+
+def link_related(recipes, field, related_lists):
+    """Insert the m2m rows linking each recipe to its related objects"""
+    # returns the ids of the related objects now linked
+    model_field = Recipe._meta.get_field(field)
+    through = model_field.remote_field.through
+    column = f'{model_field.m2m_reverse_field_name()}_id'
+    related_ids = set()
+    rows = []
+    for recipe, related in zip(recipes, related_lists):
+        # the same object twice would break the unique constraint
+        ids = dict.fromkeys(obj.pk for obj in related)
+        related_ids.update(ids)
+        rows.extend(
+            through(recipe_id=recipe.pk, **{column: related_id})
+            for related_id in ids
+        )
+    through.objects.bulk_create(rows, batch_size=THROUGH_BATCH_SIZE)
+
+    return related_ids
+
+
+def replace_related(recipes, field, related_lists):
+    """Replace the related objects of recipes, like .set() on each"""
+    model_field = Recipe._meta.get_field(field)
+    through = model_field.remote_field.through
+    column = f'{model_field.m2m_reverse_field_name()}_id'
+    current = through.objects.filter(
+        recipe_id__in=[recipe.pk for recipe in recipes])
+    unlinked = set(current.values_list(column, flat=True))
+    current.delete()
+
+    return unlinked | link_related(recipes, field, related_lists)
+
+
+def create_recipes(user, items):
+    """Create recipes from validated serializer data in one transaction"""
+    related = {field: [] for field in RELATED_FIELDS}
+    recipes = []
+    resolve_names(user, items)
+    for item in items:
+        item = dict(item)
+        for field in RELATED_FIELDS:
+            related[field].append(item.pop(field, ()))
+        recipes.append(Recipe(user=user, **item))
+
+    with transaction.atomic():
+        insert_with_ids(Recipe, recipes)
+        for field in RELATED_FIELDS:
+            # bulk inserts skip m2m_changed, so recount usage here
+            recount_usage(
+                Recipe._meta.get_field(field).related_model,
+                link_related(recipes, field, related[field])
+            )
+        invalidate(Recipe, [user.pk])
+
+    return recipes
+
+
+def update_recipes(user, changes):
+    """Apply (id, validated partial data) changes to recipes in bulk"""
+    # bulk_update writes the same fields for every object, so recipes
+    # are grouped by the set of fields they change
+    groups = {}
+    related = {field: {} for field in RELATED_FIELDS}
+    now = timezone.now()
+    resolve_names(user, [data for _, data in changes])
+    for pk, data in changes:
+        recipe = Recipe(pk=pk, user=user, updated_at=now)
+        for name, value in data.items():
+            if name in related:
+                related[name][pk] = value
+            else:
+                setattr(recipe, name, value)
+        fields = tuple(sorted(set(data) - set(RELATED_FIELDS)))
+        groups.setdefault(fields, []).append(recipe)
+
+    with transaction.atomic():
+        for fields, recipes in groups.items():
+            Recipe.objects.bulk_update(recipes, ('updated_at',) + fields)
+        for field, values in related.items():
+            if values:
+                recount_usage(
+                    Recipe._meta.get_field(field).related_model,
+                    replace_related(
+                        [Recipe(pk=pk) for pk in values],
+                        field,
+                        list(values.values())
+                    )
+                )
+        invalidate(Recipe, [user.pk])
@@ -0,0 +1,78 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, parse_etags, quote_etag, \
+    parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.metrics import record_cache
+from core.versions import get_last_modified, get_version, user_scope
+
+
+class ConditionalCacheMixin:
+    """Answer reads with ETag/Last-Modified and a per user response cache"""
+    # cached responses are keyed on the user's data version, so any change
+    # to their recipes, tags or ingredients invalidates them, see core.signals
+    cache_timeout = settings.RESPONSE_CACHE_TIMEOUT
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        """Run a read handler unless the client or cache has its result"""
+        if not settings.RESPONSE_CACHE:
+            # versions of other processes' writes would never reach this one
+            return handler(request, *args, **kwargs)
+
+        scope = user_scope(request.user.pk)
+        version = get_version(scope)
+        last_modified = int(get_last_modified(scope))
+        # the response depends on the url and the negotiated format
+        variant = hashlib.md5(
+            f'{request.get_full_path()}:{request.accepted_renderer.format}'
+            .encode()
+        ).hexdigest()
+        etag = quote_etag(f'{version:x}-{variant}')
+
+        if self._not_modified(request, etag, last_modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            return self._add_headers(response, etag, last_modified)
+
+        key = f'response:{request.user.pk}:{version}:{variant}'
+        data = cache.get(key)
+        record_cache('response', data is not None)
+        if data is not None:
+            return self._add_headers(Response(data), etag, last_modified)
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, self.cache_timeout)
+            self._add_headers(response, etag, last_modified)
+
+        return response
+
+    def _not_modified(self, request, etag, last_modified):
+        """Check the client's conditional headers against the current state"""
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            etags = parse_etags(if_none_match)
+            return etag in etags or '*' in etags
+
+        if_modified_since = parse_http_date_safe(
+            request.META.get('HTTP_IF_MODIFIED_SINCE', '')
+        )
+        return if_modified_since is not None and \
+            last_modified <= if_modified_since
+
+    def _add_headers(self, response, etag, last_modified):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        # clients must revalidate, and shared caches must not store it
+        patch_cache_control(response, private=True, no_cache=True)
+
+        return response
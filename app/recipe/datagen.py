@@ -0,0 +1,222 @@
+import itertools
+import random
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connections, router, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from core.bulk import copy_rows
+from core.models import Tag, Ingredient, Recipe
+from core.signals import recount_usage
+from core.versions import invalidate
+
+# words that recipe names are made of, so that searches find something
+DISHES = (
+    'soup', 'noodles', 'curry', 'salad', 'stew', 'pie', 'roast', 'tacos',
+    'risotto', 'dumplings', 'burger', 'omelette', 'pancakes', 'stir fry',
+)
+STYLES = (
+    'spicy', 'creamy', 'smoky', 'crispy', 'sweet', 'sour', 'garlic',
+    'lemon', 'herby', 'cheesy', 'vegan', 'quick', 'slow cooked', 'grilled',
+)
+
+# rows per INSERT or COPY statement
+BATCH_SIZE = 10000
+
+
+def zipf_weights(count, skew):
+    """Return Zipf-like weights 1 / rank ** skew for ranks 1 to count"""
+    return [1 / rank ** skew for rank in range(1, count + 1)]
+
+
+def split_total(total, weights, minimum=1):
+    """Split a total in proportion to weights, at least minimum each"""
+    scale = total / sum(weights)
+
+    return [max(minimum, round(weight * scale)) for weight in weights]
+
+
+class Writer:
+    """Insert rows with explicit ids, with COPY on postgres"""
+
+    def __init__(self):
+        self.connection = connections[router.db_for_write(Recipe)]
+
+    def next_id(self, model):
+        """Return the first id after the existing rows of a model"""
+        last = model._base_manager.aggregate(last=Max('pk'))['last']
+
+        return (last or 0) + 1
+
+    def write(self, model, columns, rows):
+        """Insert rows given as tuples of column values"""
+        rows = iter(rows)
+        while True:
+            batch = list(itertools.islice(rows, BATCH_SIZE))
+            if not batch:
+                return
+            with self.connection.cursor() as cursor:
+                if self.connection.vendor == 'postgresql':
+                    copy_rows(cursor, model._meta.db_table, columns, batch)
+                else:
+                    self.insert(cursor, model, columns, batch)
+
+    def insert(self, cursor, model, columns, rows):
+        """Insert rows with executemany, skipping model instances"""
+        quote = self.connection.ops.quote_name
+        fields = [model._meta.get_field(column) for column in columns]
+        cursor.executemany(
+            'INSERT INTO {} ({}) VALUES ({})'.format(
+                quote(model._meta.db_table),
+                ', '.join(quote(column) for column in columns),
+                ', '.join(['%s'] * len(columns))
+            ),
+            [
+                [
+                    field.get_db_prep_save(value, self.connection)
+                    for field, value in zip(fields, row)
+                ]
+                for row in rows
+            ]
+        )
+
+    def reset_sequence(self, model):
+        """Move the id sequence past explicitly inserted ids"""
+        if self.connection.vendor != 'postgresql':
+            return
+        table = model._meta.db_table
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT setval(pg_get_serial_sequence(%s, 'id'), "
+                'coalesce(max(id), 1)) FROM {}'.format(
+                    self.connection.ops.quote_name(table)),
+                [table]
+            )
+
+
+def write_recipes(writer, rng, user_id, recipe_ids, related, links, now):
+    """Write recipes and their links, returning the number of links"""
+    recipe_rows = []
+    link_rows = {key: [] for key in related}
+    for recipe_id in recipe_ids:
+        name = f'{rng.choice(STYLES)} {rng.choice(DISHES)} {recipe_id}'
+        recipe_rows.append((
+            recipe_id,
+            user_id,
+            name.capitalize(),
+            min(240, int(rng.paretovariate(1.2) * 5)),
+            Decimal(rng.randint(100, 99999)) / 100,
+            '',
+            now,
+        ))
+        for key, (ids, cum_weights) in related.items():
+            chosen = rng.choices(
+                ids, cum_weights=cum_weights, k=rng.randint(0, links * 2))
+            link_rows[key].extend(
+                (recipe_id, related_id) for related_id in dict.fromkeys(chosen)
+            )
+
+    writer.write(
+        Recipe,
+        ('id', 'user_id', 'name', 'time_minutes', 'price', 'link',
+         'updated_at'),
+        recipe_rows
+    )
+    for key, rows in link_rows.items():
+        model_field = Recipe._meta.get_field(key)
+        writer.write(
+            model_field.remote_field.through,
+            ('recipe_id', f'{model_field.m2m_reverse_field_name()}_id'),
+            rows
+        )
+
+    return sum(len(rows) for rows in link_rows.values())
+
+
+def generate(users, recipes, tags, ingredients, links=3, skew=1.1, seed=0,
+             report=None):
+    """Generate users whose recipes, tags and links follow a Zipf skew"""
+    # meant for an otherwise idle benchmark database, ids are assigned
+    # here so links can be written without reading anything back
+    rng = random.Random(seed)
+    writer = Writer()
+    user_model = get_user_model()
+    weights = zipf_weights(users, skew)
+    counts = {
+        'recipes': split_total(recipes, weights),
+        'tags': split_total(tags, weights),
+        'ingredients': split_total(ingredients, weights),
+    }
+    next_ids = {
+        model: writer.next_id(model)
+        for model in (user_model, Tag, Ingredient, Recipe)
+    }
+    password = make_password('synthetic')
+    now = timezone.now()
+    totals = dict.fromkeys(
+        ('users', 'recipes', 'tags', 'ingredients', 'links'), 0)
+
+    for index in range(users):
+        with transaction.atomic():
+            user_id = next_ids[user_model]
+            next_ids[user_model] += 1
+            writer.write(
+                user_model,
+                ('id', 'email', 'name', 'password', 'is_active', 'is_staff',
+                 'is_superuser'),
+                [(user_id, f'synthetic-{seed}-{index}@example.com',
+                  f'Synthetic {index}', password, True, False, False)]
+            )
+
+            related = {}
+            for model, key, label in ((Tag, 'tags', 'Tag'),
+                                      (Ingredient, 'ingredients',
+                                       'Ingredient')):
+                first = next_ids[model]
+                count = counts[key][index]
+                next_ids[model] += count
+                writer.write(
+                    model,
+                    ('id', 'user_id', 'name', 'updated_at', 'recipe_count'),
+                    (
+                        (first + i, user_id, f'{label} {i}', now, 0)
+                        for i in range(count)
+                    )
+                )
+                # popular tags and ingredients are linked far more often
+                related[key] = (
+                    list(range(first, first + count)),
+                    list(itertools.accumulate(zipf_weights(count, skew))),
+                )
+                totals[key] += count
+
+            first = next_ids[Recipe]
+            count = counts['recipes'][index]
+            next_ids[Recipe] += count
+            # written a batch at a time to keep memory flat for big users
+            for start in range(first, first + count, BATCH_SIZE):
+                recipe_ids = range(start, min(start + BATCH_SIZE,
+                                              next_ids[Recipe]))
+                totals['links'] += write_recipes(
+                    writer, rng, user_id, recipe_ids, related, links, now)
+
+            for key in related:
+                model = Recipe._meta.get_field(key).related_model
+                recount_usage(
+                    model, model._base_manager.filter(user_id=user_id))
+
+            for model in (Tag, Ingredient, Recipe):
+                invalidate(model, [user_id])
+
+        totals['users'] += 1
+        totals['recipes'] += count
+        if report is not None:
+            report(dict(totals))
+
+    for model in next_ids:
+        writer.reset_sequence(model)
+
+    return totals
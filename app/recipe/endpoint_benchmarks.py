@@ -0,0 +1,336 @@
+import io
+import itertools
+import math
+import statistics
+import tempfile
+import time
+import tracemalloc
+from collections import namedtuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test.utils import override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+from core.timing import QueryTimer
+from core.versions import invalidate
+
+from recipe.benchmarks import seed_recipes
+
+# a route called with the given method, prepare(context) returns the url
+# arguments and payload of one call and runs outside the timings
+Endpoint = namedtuple(
+    'Endpoint', 'name method url_name prepare status format',
+    defaults=(None,)
+)
+
+# latency differences below this are noise, whatever the tolerance
+LATENCY_SLACK_MS = 1.0
+
+
+class Context:
+    """The seeded user and objects the endpoints are called with"""
+
+    def __init__(self, user):
+        self.user = user
+        self.recipe_ids = list(
+            Recipe.objects.filter(user=user).order_by('id').values_list(
+                'id', flat=True)
+        )
+        self.tag_ids = list(
+            Tag.objects.filter(user=user).order_by('id').values_list(
+                'id', flat=True)
+        )
+        self.ingredient_ids = list(
+            Ingredient.objects.filter(user=user).order_by('id').values_list(
+                'id', flat=True)
+        )
+        self.counter = itertools.count()
+
+    def unique(self, prefix):
+        """Return a name no other call has used"""
+        return f'{prefix} {next(self.counter)}'
+
+    def new_recipes(self, count):
+        """Create recipes for a call that deletes them"""
+        return [
+            Recipe.objects.create(
+                user=self.user,
+                name=self.unique('Disposable'),
+                time_minutes=10,
+                price=5
+            ).pk
+            for _ in range(count)
+        ]
+
+    def new_user(self):
+        """Create a user for a call that deletes it, returning its token"""
+        user = get_user_model().objects.create_user(
+            email=self.unique('benchmark').replace(' ', '-') + '@example.com',
+            password='benchmark'
+        )
+
+        return Token.objects.create(user=user).key
+
+
+def _image():
+    """Return a small JPEG upload"""
+    buffer = io.BytesIO()
+    Image.new('RGB', (10, 10)).save(buffer, format='JPEG')
+
+    return SimpleUploadedFile('image.jpg', buffer.getvalue(), 'image/jpeg')
+
+
+def _recipe_payload(context):
+    return {
+        'name': context.unique('Recipe'),
+        'time_minutes': 30,
+        'price': '12.50',
+        'tags': context.tag_ids[:2],
+        'ingredients': context.ingredient_ids[:3],
+    }
+
+
+ENDPOINTS = (
+    Endpoint('api root', 'get', 'recipe:api-root', lambda c: {}, 200),
+    Endpoint('list tags', 'get', 'recipe:tag-list', lambda c: {}, 200),
+    Endpoint(
+        'autocomplete tags', 'get', 'recipe:tag-list',
+        lambda c: {'data': {'q': 'Tag 1'}}, 200
+    ),
+    Endpoint(
+        'create tag', 'post', 'recipe:tag-list',
+        lambda c: {'data': {'name': c.unique('Tag')}}, 201
+    ),
+    Endpoint(
+        'list ingredients', 'get', 'recipe:ingredient-list',
+        lambda c: {'data': {'ordering': '-usage'}}, 200
+    ),
+    Endpoint(
+        'create ingredient', 'post', 'recipe:ingredient-list',
+        lambda c: {'data': {'name': c.unique('Ingredient')}}, 201
+    ),
+    Endpoint('list recipes', 'get', 'recipe:recipe-list', lambda c: {}, 200),
+    Endpoint(
+        'filter recipes', 'get', 'recipe:recipe-list',
+        lambda c: {'data': {
+            'tags': ','.join(map(str, c.tag_ids[:3])),
+            'ordering': 'price',
+        }},
+        200
+    ),
+    Endpoint(
+        'create recipe', 'post', 'recipe:recipe-list',
+        lambda c: {'data': _recipe_payload(c)}, 201, 'json'
+    ),
+    Endpoint(
+        'get recipe', 'get', 'recipe:recipe-detail',
+        lambda c: {'args': [c.recipe_ids[-1]]}, 200
+    ),
+    Endpoint(
+        'update recipe', 'patch', 'recipe:recipe-detail',
+        lambda c: {
+            'args': [c.recipe_ids[-1]],
+            'data': {'name': c.unique('Recipe'), 'tags': c.tag_ids[:2]},
+        },
+        200, 'json'
+    ),
+    Endpoint(
+        'delete recipe', 'delete', 'recipe:recipe-detail',
+        lambda c: {'args': c.new_recipes(1)}, 204
+    ),
+    Endpoint(
+        'bulk create recipes', 'post', 'recipe:recipe-bulk',
+        lambda c: {'data': [_recipe_payload(c) for _ in range(20)]},
+        201, 'json'
+    ),
+    Endpoint(
+        'bulk update recipes', 'patch', 'recipe:recipe-bulk',
+        lambda c: {'data': [
+            {'id': pk, 'price': '9.99', 'tags': c.tag_ids[:2]}
+            for pk in c.recipe_ids[:20]
+        ]},
+        200, 'json'
+    ),
+    Endpoint(
+        'bulk delete recipes', 'delete', 'recipe:recipe-bulk',
+        lambda c: {'data': c.new_recipes(20)}, 204, 'json'
+    ),
+    Endpoint(
+        'export recipes', 'get', 'recipe:recipe-export', lambda c: {}, 200
+    ),
+    Endpoint(
+        'upload recipe image', 'post', 'recipe:recipe-upload-image',
+        lambda c: {'args': [c.recipe_ids[0]], 'data': {'image': _image()}},
+        200, 'multipart'
+    ),
+    Endpoint(
+        'create user', 'post', 'user:create',
+        lambda c: {'data': {
+            'email': f'{c.unique("user").replace(" ", "-")}@example.com',
+            'password': 'benchmark',
+            'name': 'Benchmark',
+        }},
+        201
+    ),
+    Endpoint(
+        'create token', 'post', 'user:token',
+        lambda c: {'data': {
+            'email': c.user.email,
+            'password': 'benchmark',
+        }},
+        200
+    ),
+    Endpoint('get user', 'get', 'user:me', lambda c: {}, 200),
+    Endpoint(
+        'update user', 'patch', 'user:me',
+        lambda c: {'data': {'name': c.unique('Benchmark')}}, 200
+    ),
+    Endpoint(
+        'delete user', 'delete', 'user:me',
+        lambda c: {'token': c.new_user()}, 204
+    ),
+)
+
+
+def percentile(values, percent):
+    """Return the nearest rank percentile of a list of values"""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+
+    return ordered[rank - 1]
+
+
+def _call(client, endpoint, call, token, user):
+    """Make a prepared call, returning the response and its time"""
+    # repeated reads would otherwise be answered by the response and query
+    # caches, measuring cache hits whatever the size of the dataset
+    for model in (Tag, Ingredient, Recipe):
+        invalidate(model, [user.pk])
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Token {call.get("token", token)}')
+    url = reverse(endpoint.url_name, args=call.get('args'))
+    kwargs = {}
+    if endpoint.format is not None:
+        kwargs['format'] = endpoint.format
+
+    start = time.perf_counter()
+    response = getattr(client, endpoint.method)(
+        url, call.get('data'), **kwargs)
+    if response.streaming:
+        # a streamed export does its work while being consumed
+        b''.join(response.streaming_content)
+    seconds = time.perf_counter() - start
+
+    if response.status_code != endpoint.status:
+        raise AssertionError(
+            f'{endpoint.name} returned {response.status_code}, '
+            f'expected {endpoint.status}'
+        )
+
+    return response, seconds
+
+
+def measure_endpoint(client, endpoint, context, token, repeat):
+    """Return the latency, queries and peak memory of an endpoint"""
+    # a first call warms up caches and lazy imports, a second one is
+    # traced for memory, tracing slows down the calls that are timed
+    _call(client, endpoint, endpoint.prepare(context), token, context.user)
+    call = endpoint.prepare(context)
+    tracemalloc.start()
+    try:
+        _call(client, endpoint, call, token, context.user)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    timings = []
+    queries = []
+    query_seconds = []
+    for _ in range(repeat):
+        call = endpoint.prepare(context)
+        timer = QueryTimer()
+        with connection.execute_wrapper(timer):
+            _, seconds = _call(
+                client, endpoint, call, token, context.user)
+        timings.append(seconds)
+        queries.append(timer.count)
+        query_seconds.append(timer.seconds)
+
+    return dict(
+        endpoint=endpoint.name,
+        method=endpoint.method.upper(),
+        url_name=endpoint.url_name,
+        p50_ms=round(percentile(timings, 50) * 1000, 3),
+        p99_ms=round(percentile(timings, 99) * 1000, 3),
+        queries=max(queries),
+        query_ms=round(statistics.median(query_seconds) * 1000, 3),
+        peak_kb=round(peak / 1024, 1),
+    )
+
+
+def run(sizes, repeat, seed=0, endpoints=ENDPOINTS):
+    """Benchmark endpoints against datasets of each size, rolled back"""
+    results = []
+    # uploads go to a throwaway directory, the test client's host is
+    # allowed whatever the deployment settings say
+    with tempfile.TemporaryDirectory() as media, override_settings(
+            MEDIA_ROOT=media,
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        for size in sizes:
+            with transaction.atomic():
+                user = seed_recipes(size, seed=seed)
+                context = Context(user)
+                token = Token.objects.create(user=user).key
+                client = APIClient()
+                for endpoint in endpoints:
+                    result = measure_endpoint(
+                        client, endpoint, context, token, repeat)
+                    results.append(dict(size=size, **result))
+                transaction.set_rollback(True)
+
+    return {
+        'database': connection.vendor,
+        'repeat': repeat,
+        'seed': seed,
+        'results': results,
+    }
+
+
+def compare(report, baseline, latency_tolerance, query_tolerance,
+            memory_tolerance):
+    """Return a description of every regression against a baseline"""
+    expected = {
+        (result['size'], result['endpoint']): result
+        for result in baseline['results']
+    }
+    regressions = []
+    for result in report['results']:
+        base = expected.get((result['size'], result['endpoint']))
+        if base is None:
+            continue
+
+        label = f'{result["endpoint"]} at {result["size"]} recipes'
+        for key in ('p50_ms', 'p99_ms'):
+            limit = max(
+                base[key] * (1 + latency_tolerance),
+                base[key] + LATENCY_SLACK_MS
+            )
+            if result[key] > limit:
+                regressions.append(
+                    f'{label}: {key} {result[key]} > {round(limit, 3)}')
+        if result['queries'] > base['queries'] + query_tolerance:
+            regressions.append(
+                f'{label}: queries {result["queries"]} > {base["queries"]}')
+        limit = base['peak_kb'] * (1 + memory_tolerance)
+        if result['peak_kb'] > limit:
+            regressions.append(
+                f'{label}: peak_kb {result["peak_kb"]} > {round(limit, 1)}')
+
+    return regressions
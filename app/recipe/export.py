@@ -0,0 +1,107 @@
+import csv
+import json
+from itertools import islice
+
+from django.db import connections, transaction
+
+from core.models import Recipe
+
+# recipe columns written for every exported recipe
+EXPORT_FIELDS = ('id', 'name', 'time_minutes', 'price', 'link')
+# relations exported as lists of names
+EXPORT_RELATIONS = ('tags', 'ingredients')
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def _related_names(field, recipe_ids, using):
+    """Return the related names of a chunk of recipes, grouped by recipe"""
+    model_field = Recipe._meta.get_field(field)
+    through = model_field.remote_field.through
+    related = model_field.m2m_reverse_field_name()
+    names = {}
+    rows = through.objects.using(using).filter(
+        recipe_id__in=recipe_ids
+    ).order_by(f'{related}_id').values_list('recipe_id', f'{related}__name')
+    for recipe_id, name in rows:
+        names.setdefault(recipe_id, []).append(name)
+
+    return names
+
+
+def export_rows(queryset, chunk_size):
+    """Yield the recipes of a queryset as dicts, one chunk at a time"""
+    rows = queryset.values(*EXPORT_FIELDS).order_by('id').iterator(
+        chunk_size=chunk_size
+    )
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+
+        # the relations of each chunk take one query per relation, as
+        # iterator() cannot prefetch
+        ids = [row['id'] for row in chunk]
+        related = {
+            field: _related_names(field, ids, queryset.db)
+            for field in EXPORT_RELATIONS
+        }
+        for row in chunk:
+            row['price'] = str(row['price'])
+            for field in EXPORT_RELATIONS:
+                row[field] = related[field].get(row['id'], [])
+            yield row
+
+
+def snapshot_rows(queryset, chunk_size):
+    """Yield export rows read from a single consistent snapshot"""
+    using = queryset.db
+    connection = connections[using]
+    # inside a transaction already, e.g. with ATOMIC_REQUESTS, the caller's
+    # snapshot is kept, the isolation level can only be set before the
+    # first query of the outermost one
+    outermost = not connection.in_atomic_block
+    with transaction.atomic(using=using):
+        if outermost and connection.vendor == 'postgresql':
+            # every chunk sees the data as of the first query
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SET TRANSACTION ISOLATION LEVEL REPEATABLE READ '
+                    'READ ONLY'
+                )
+        yield from export_rows(queryset, chunk_size)
+
+
+class _Echo:
+    """File-like object handing back what csv.writer writes to it"""
+
+    def write(self, value):
+        return value
+
+
+def render_ndjson(rows):
+    """Yield one JSON document per line"""
+    for row in rows:
+        yield json.dumps(row, separators=(',', ':')) + '\n'
+
+
+def render_csv(rows):
+    """Yield CSV lines, with related names as JSON lists"""
+    writer = csv.writer(_Echo())
+    columns = EXPORT_FIELDS + EXPORT_RELATIONS
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([
+            json.dumps(row[column]) if column in EXPORT_RELATIONS
+            else row[column]
+            for column in columns
+        ])
+
+
+RENDERERS = {
+    'ndjson': render_ndjson,
+    'csv': render_csv,
+}
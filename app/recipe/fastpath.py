@@ -0,0 +1,173 @@
+from collections import defaultdict
+
+from django.db import connections
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+from rest_framework.response import Response
+
+# output fields whose database values are already in their JSON form
+PASSTHROUGH_FIELDS = (
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.BooleanField,
+)
+
+# output fields converted by the serializer field's own to_representation
+CONVERTED_FIELDS = (
+    serializers.DecimalField,
+)
+
+
+def _is_column(field):
+    """Check a field reads a single concrete column of the model"""
+    return field.source != '*' and '.' not in field.source
+
+
+def _column(field):
+    """Return the converter for a scalar field, or False if unsupported"""
+    if not _is_column(field):
+        return False
+    if isinstance(field, PASSTHROUGH_FIELDS):
+        return None
+    if isinstance(field, CONVERTED_FIELDS):
+        return field.to_representation
+
+    return False
+
+
+class ValuesPlan:
+    """Build a serializer's output from .values() rows and related id lists"""
+
+    def __init__(self, model, columns, related):
+        self.model = model
+        # (output name, model field, converter or None)
+        self.columns = columns
+        # (output name, m2m field, nested (output name, column) or None)
+        self.related = related
+
+    @classmethod
+    def for_serializer(cls, serializer):
+        """Return a plan for a serializer, or None if it is unsupported"""
+        columns = []
+        related = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+
+            if isinstance(field, ManyRelatedField):
+                child = field.child_relation
+                if not isinstance(child, PrimaryKeyRelatedField) \
+                        or child.pk_field is not None:
+                    return None
+                related.append((name, field.source, None))
+            elif isinstance(field, serializers.ListSerializer):
+                nested = []
+                for child_name, child in field.child.fields.items():
+                    if child.write_only:
+                        continue
+                    if _column(child) is not None:
+                        return None
+                    nested.append((child_name, child.source))
+                related.append((name, field.source, nested))
+            else:
+                converter = _column(field)
+                if converter is False:
+                    return None
+                columns.append((name, field.source, converter))
+
+        return cls(serializer.Meta.model, columns, related)
+
+    def values(self, queryset, *extra):
+        """Return the rows needed for the plan from a queryset"""
+        names = {'pk'} | {source for _, source, _ in self.columns}
+        names.update(extra)
+
+        return queryset.prefetch_related(None).values(*names)
+
+    def serialize(self, rows, using):
+        """Return the output dicts for a page of rows"""
+        ids = [row['pk'] for row in rows]
+        related = {
+            source: self._related_values(source, nested, ids, using)
+            for _, source, nested in self.related
+        }
+
+        data = []
+        for row in rows:
+            item = {}
+            for name, source, converter in self.columns:
+                value = row[source]
+                if converter is not None and value is not None:
+                    value = converter(value)
+                item[name] = value
+            for name, source, _ in self.related:
+                item[name] = related[source].get(row['pk'], [])
+            data.append(item)
+
+        return data
+
+    def _related_values(self, source, nested, ids, using):
+        """Group the related ids or nested dicts of a m2m field by row"""
+        field = self.model._meta.get_field(source)
+        through = field.remote_field.through
+        from_column = f'{field.m2m_field_name()}_id'
+        to_column = f'{field.m2m_reverse_field_name()}_id'
+        rows = through.objects.using(using).filter(
+            **{f'{from_column}__in': ids}
+        ).order_by(to_column)
+
+        if nested is None:
+            if connections[using].vendor == 'postgresql':
+                # aggregate into one array per row on the database side
+                from django.contrib.postgres.aggregates import ArrayAgg
+                rows = rows.values(from_column).annotate(
+                    related_ids=ArrayAgg(to_column, ordering=to_column)
+                ).order_by()
+                return dict(rows.values_list(from_column, 'related_ids'))
+
+            grouped = defaultdict(list)
+            for from_id, to_id in rows.values_list(from_column, to_column):
+                grouped[from_id].append(to_id)
+            return grouped
+
+        # the related primary key is already on the through table
+        prefix = field.m2m_reverse_field_name()
+        lookups = [
+            to_column if column in ('id', 'pk') else f'{prefix}__{column}'
+            for _, column in nested
+        ]
+        grouped = defaultdict(list)
+        for values in rows.values_list(from_column, *lookups):
+            grouped[values[0]].append({
+                name: value for (name, _), value in zip(nested, values[1:])
+            })
+        return grouped
+
+
+class ValuesListMixin:
+    """List objects straight from .values() rows, skipping model instances"""
+
+    def list(self, request, *args, **kwargs):
+        plan = ValuesPlan.for_serializer(self.get_serializer())
+        if plan is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        # the paginator reads its position from the ordering fields
+        ordering = ()
+        if hasattr(self.paginator, 'get_ordering'):
+            ordering = self.paginator.get_ordering(
+                request, queryset, self
+            )
+        rows = plan.values(
+            queryset,
+            *[field.lstrip('-') for field in ordering]
+        )
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(
+                plan.serialize(page, queryset.db)
+            )
+
+        return Response(plan.serialize(list(rows), queryset.db))
@@ -0,0 +1,54 @@
+from django.db.models import Count, Exists, OuterRef
+from rest_framework.exceptions import ValidationError
+
+from core.models import Recipe
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+MATCH_MODES = (MATCH_ANY, MATCH_ALL)
+
+
+def _through_rows(field, ids):
+    """Return the m2m rows linking recipes to any of the given ids"""
+    through = Recipe._meta.get_field(field).remote_field.through
+    column = f'{Recipe._meta.get_field(field).m2m_reverse_field_name()}_id'
+
+    return through.objects.filter(**{f'{column}__in': ids}), column
+
+
+def filter_related(queryset, field, ids, match=MATCH_ANY):
+    """Filter recipes linked to any or all of the given related ids"""
+    if match not in MATCH_MODES:
+        raise ValidationError({
+            f'{field}_match': f'Must be one of: {", ".join(MATCH_MODES)}.'
+        })
+
+    rows, column = _through_rows(field, ids)
+    if match == MATCH_ANY:
+        # a semi-join returns each recipe once however many ids match
+        return queryset.filter(Exists(rows.filter(recipe_id=OuterRef('pk'))))
+
+    # recipes with one link per requested id, grouped on the through
+    # table instead of joining it once per id
+    matching = rows.values('recipe_id').annotate(
+        matched=Count(column)
+    ).filter(matched=len(set(ids))).values('recipe_id')
+
+    return queryset.filter(pk__in=matching)
+
+
+def exclude_related(queryset, field, ids):
+    """Exclude recipes linked to any of the given related ids"""
+    rows, _ = _through_rows(field, ids)
+
+    return queryset.filter(~Exists(rows.filter(recipe_id=OuterRef('pk'))))
+
+
+def filter_assigned(queryset):
+    """Filter tags or ingredients used by at least one recipe"""
+    relation = queryset.model._meta.get_field('recipe')
+    column = f'{relation.field.m2m_reverse_field_name()}_id'
+    rows = relation.through.objects.filter(**{column: OuterRef('pk')})
+
+    # a semi-join instead of a join that needs .distinct() afterwards
+    return queryset.filter(Exists(rows))
@@ -0,0 +1,311 @@
+import functools
+import http.client
+import io
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter, namedtuple
+from urllib.parse import urlencode, urlsplit
+
+from PIL import Image
+
+from recipe.endpoint_benchmarks import percentile
+
+# relative weights of the request kinds, see REQUESTS
+DEFAULT_MIX = {
+    'list': 40,
+    'detail': 25,
+    'filter': 20,
+    'create': 10,
+    'upload': 5,
+}
+
+# upper bounds of the latency histogram buckets in milliseconds
+LATENCY_BUCKETS_MS = (
+    1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float('inf'),
+)
+
+# recipes created per bulk request while setting up, see RecipeViewSet
+SETUP_BATCH_SIZE = 100
+
+Result = namedtuple('Result', 'kind status seconds')
+
+
+class RequestFailed(Exception):
+    """A setup request did not return the expected status"""
+
+
+class Client:
+    """A keep-alive HTTP connection to the server under test"""
+
+    def __init__(self, base_url, timeout=30):
+        parts = urlsplit(base_url)
+        connection_class = http.client.HTTPSConnection \
+            if parts.scheme == 'https' else http.client.HTTPConnection
+        self.connection = connection_class(parts.netloc, timeout=timeout)
+        self.prefix = parts.path.rstrip('/')
+
+    def request(self, method, path, token=None, body=None,
+                content_type='application/json'):
+        """Send a request, returning its status and body"""
+        headers = {}
+        if token is not None:
+            headers['Authorization'] = f'Token {token}'
+        if body is not None:
+            headers['Content-Type'] = content_type
+            if content_type == 'application/json':
+                body = json.dumps(body).encode()
+        try:
+            self.connection.request(
+                method, self.prefix + path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            content = response.read()
+        except (OSError, http.client.HTTPException):
+            # the next request reconnects
+            self.connection.close()
+            raise
+
+        return response.status, content
+
+    def expect(self, status, method, path, **kwargs):
+        """Send a setup request, returning its decoded JSON body"""
+        actual, content = self.request(method, path, **kwargs)
+        if actual != status:
+            raise RequestFailed(
+                f'{method} {path} returned {actual}: {content[:500]!r}')
+
+        return json.loads(content) if content else None
+
+    def close(self):
+        """Close the connection"""
+        self.connection.close()
+
+
+class Session:
+    """A load test user with its token and recipes"""
+
+    def __init__(self, email, token, tag_ids, ingredient_ids):
+        self.email = email
+        self.token = token
+        self.tag_ids = tag_ids
+        self.ingredient_ids = ingredient_ids
+        self.recipe_ids = []
+
+
+def create_session(client, email, recipes, rng):
+    """Sign up a user through the API and give them some recipes"""
+    client.expect(201, 'POST', '/api/user/create/', body={
+        'email': email,
+        'password': 'loadtest-password',
+        'name': 'Load test',
+    })
+    token = client.expect(200, 'POST', '/api/user/token/', body={
+        'email': email,
+        'password': 'loadtest-password',
+    })['token']
+    session = Session(
+        email,
+        token,
+        _create_named(client, token, 'tags', 'Tag'),
+        _create_named(client, token, 'ingredients', 'Ingredient')
+    )
+
+    for start in range(0, recipes, SETUP_BATCH_SIZE):
+        count = min(SETUP_BATCH_SIZE, recipes - start)
+        created = client.expect(
+            201, 'POST', '/api/recipe/recipes/bulk/', token=token,
+            body=[recipe_payload(session, rng) for _ in range(count)]
+        )
+        session.recipe_ids.extend(recipe['id'] for recipe in created)
+
+    return session
+
+
+def _create_named(client, token, route, label, count=5):
+    """Create tags or ingredients, returning their ids"""
+    return [
+        client.expect(
+            201, 'POST', f'/api/recipe/{route}/', token=token,
+            body={'name': f'{label} {i}'}
+        )['id']
+        for i in range(count)
+    ]
+
+
+def recipe_payload(session, rng):
+    """Return a new recipe linked to some of the session's tags"""
+    return {
+        'name': f'Load test recipe {rng.randrange(10 ** 6)}',
+        'time_minutes': rng.randint(5, 120),
+        'price': f'{rng.randint(100, 5000) / 100:.2f}',
+        'tags': rng.sample(session.tag_ids, 2),
+        'ingredients': rng.sample(session.ingredient_ids, 3),
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def _image_body():
+    """Return a multipart body holding a small JPEG and its content type"""
+    image = io.BytesIO()
+    Image.new('RGB', (100, 100)).save(image, format='JPEG')
+    boundary = uuid.uuid4().hex
+    body = (
+        f'--{boundary}\r\n'
+        'Content-Disposition: form-data; name="image"; '
+        'filename="image.jpg"\r\n'
+        'Content-Type: image/jpeg\r\n\r\n'
+    ).encode() + image.getvalue() + f'\r\n--{boundary}--\r\n'.encode()
+
+    return body, f'multipart/form-data; boundary={boundary}'
+
+
+def request_list(client, session, rng):
+    """List the first page of recipes"""
+    return client.request('GET', '/api/recipe/recipes/', session.token)
+
+
+def request_detail(client, session, rng):
+    """Retrieve a random recipe"""
+    recipe_id = rng.choice(session.recipe_ids)
+    return client.request(
+        'GET', f'/api/recipe/recipes/{recipe_id}/', session.token)
+
+
+def request_filter(client, session, rng):
+    """List recipes with two of the tags, in a random sort order"""
+    query = urlencode({
+        'tags': ','.join(map(str, rng.sample(session.tag_ids, 2))),
+        'ordering': rng.choice(('price', '-price', 'time_minutes')),
+    })
+    return client.request(
+        'GET', f'/api/recipe/recipes/?{query}', session.token)
+
+
+def request_create(client, session, rng):
+    """Create a recipe"""
+    return client.request(
+        'POST', '/api/recipe/recipes/', session.token,
+        body=recipe_payload(session, rng)
+    )
+
+
+def request_upload(client, session, rng):
+    """Upload an image to a random recipe"""
+    body, content_type = _image_body()
+    recipe_id = rng.choice(session.recipe_ids)
+    return client.request(
+        'POST', f'/api/recipe/recipes/{recipe_id}/upload-image/',
+        session.token, body=body, content_type=content_type
+    )
+
+
+# request kinds of the mix, called with a client, a session and a Random
+REQUESTS = {
+    'list': request_list,
+    'detail': request_detail,
+    'filter': request_filter,
+    'create': request_create,
+    'upload': request_upload,
+}
+
+
+def worker(base_url, sessions, mix, deadline, budget, seed, results):
+    """Send requests from the mix until the deadline or budget runs out"""
+    rng = random.Random(seed)
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    client = Client(base_url)
+    try:
+        while time.monotonic() < deadline and budget.take():
+            kind = rng.choices(kinds, weights)[0]
+            start = time.perf_counter()
+            try:
+                status, _ = REQUESTS[kind](
+                    client, rng.choice(sessions), rng)
+            except (OSError, http.client.HTTPException):
+                # connection errors are counted as errors without a status
+                status = None
+            results.append(
+                Result(kind, status, time.perf_counter() - start))
+    finally:
+        client.close()
+
+
+class Budget:
+    """A thread safe count of the requests left to send, if limited"""
+
+    def __init__(self, total=None):
+        self.left = total
+        self.lock = threading.Lock()
+
+    def take(self):
+        """Return whether another request may be sent"""
+        if self.left is None:
+            return True
+        with self.lock:
+            if self.left <= 0:
+                return False
+            self.left -= 1
+            return True
+
+
+def run(base_url, sessions, mix, workers, duration, requests=None,
+        seed=0):
+    """Run the load test, returning every result and the elapsed time"""
+    deadline = time.monotonic() + duration
+    budget = Budget(requests)
+    results = [[] for _ in range(workers)]
+    threads = [
+        threading.Thread(
+            target=worker,
+            args=(base_url, sessions, mix, deadline, budget, seed + number,
+                  results[number]),
+            name=f'loadtest-{number}'
+        )
+        for number in range(workers)
+    ]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return [
+        result for worker_results in results for result in worker_results
+    ], time.monotonic() - start
+
+
+def summarize(results, seconds):
+    """Return the throughput, error rate and latencies of some results"""
+    timings = [result.seconds * 1000 for result in results]
+    errors = sum(
+        1 for result in results
+        if result.status is None or result.status >= 400
+    )
+    counts = dict.fromkeys(LATENCY_BUCKETS_MS, 0)
+    for timing in timings:
+        counts[next(bound for bound in counts if timing <= bound)] += 1
+    histogram = {
+        f'<={bound:g}ms' if bound != float('inf')
+        else f'>{LATENCY_BUCKETS_MS[-2]:g}ms': count
+        for bound, count in counts.items()
+    }
+
+    summary = {
+        'requests': len(results),
+        'rps': round(len(results) / seconds, 1) if seconds else 0,
+        'error_rate': round(errors / len(results), 4) if results else 0,
+        'statuses': dict(Counter(str(result.status) for result in results)),
+        'histogram': histogram,
+    }
+    if timings:
+        summary.update(
+            p50_ms=round(percentile(timings, 50), 1),
+            p90_ms=round(percentile(timings, 90), 1),
+            p99_ms=round(percentile(timings, 99), 1),
+            max_ms=round(max(timings), 1),
+        )
+
+    return summary
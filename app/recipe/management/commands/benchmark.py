@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipe import benchmarks
+
+
+class Command(BaseCommand):
+    """Django command to benchmark recipe code against seeded data"""
+    help = 'Seed a throwaway dataset and run a benchmark scenario on it'
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenario', choices=sorted(benchmarks.SCENARIOS))
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        scenario = benchmarks.SCENARIOS[options['scenario']]
+
+        # everything created for the run is rolled back afterwards
+        with transaction.atomic():
+            self.stdout.write(f'Seeding {options["recipes"]} recipes...')
+            user = benchmarks.seed_recipes(
+                options['recipes'],
+                seed=options['seed']
+            )
+            results = scenario(user, repeat=options['repeat'])
+            transaction.set_rollback(True)
+
+        for result in results:
+            self.stdout.write(', '.join(
+                f'{key}={value}' for key, value in result.items()
+            ))
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
@@ -0,0 +1,77 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe import endpoint_benchmarks
+
+
+class Command(BaseCommand):
+    """Django command to benchmark every API endpoint"""
+    help = (
+        'Call every recipe and user endpoint through the test client '
+        'against seeded datasets, reporting latency, queries and memory. '
+        'Save a run with --output and check later runs with --baseline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[100, 1000, 10000],
+            help='Number of recipes seeded for each run'
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--only',
+            nargs='+',
+            help='Only run endpoints whose name contains one of these'
+        )
+        parser.add_argument('--output', help='Write the results as JSON')
+        parser.add_argument('--baseline', help='JSON results to compare to')
+        parser.add_argument('--latency-tolerance', type=float, default=0.5)
+        parser.add_argument('--query-tolerance', type=int, default=0)
+        parser.add_argument('--memory-tolerance', type=float, default=0.5)
+
+    def handle(self, *args, **options):
+        endpoints = endpoint_benchmarks.ENDPOINTS
+        if options['only']:
+            endpoints = [
+                endpoint for endpoint in endpoints
+                if any(name in endpoint.name for name in options['only'])
+            ]
+
+        report = endpoint_benchmarks.run(
+            options['sizes'],
+            options['repeat'],
+            seed=options['seed'],
+            endpoints=endpoints
+        )
+        for result in report['results']:
+            self.stdout.write(', '.join(
+                f'{key}={value}' for key, value in result.items()
+            ))
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, indent=2)
+            self.stdout.write(f'Results written to {options["output"]}')
+
+        if options['baseline']:
+            with open(options['baseline']) as file:
+                baseline = json.load(file)
+            regressions = endpoint_benchmarks.compare(
+                report,
+                baseline,
+                options['latency_tolerance'],
+                options['query_tolerance'],
+                options['memory_tolerance']
+            )
+            if regressions:
+                for regression in regressions:
+                    self.stderr.write(regression)
+                raise CommandError(
+                    f'{len(regressions)} regressions against the baseline')
+
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
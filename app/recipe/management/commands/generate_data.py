@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipe import datagen
+
+
+class Command(BaseCommand):
+    """Django command to fill a benchmark database with synthetic data"""
+    help = (
+        'Generate users with Zipf skewed numbers of recipes, tags, '
+        'ingredients and links. Ids are assigned by the command, so only '
+        'run it against a database nothing else is writing to.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes', type=int, default=100000)
+        parser.add_argument('--tags', type=int, default=5000)
+        parser.add_argument('--ingredients', type=int, default=20000)
+        parser.add_argument(
+            '--links',
+            type=int,
+            default=3,
+            help='Average number of tags and of ingredients per recipe'
+        )
+        parser.add_argument('--skew', type=float, default=1.1)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        start = time.monotonic()
+
+        def report(totals):
+            seconds = time.monotonic() - start
+            rows = totals['recipes'] + totals['links']
+            self.stdout.write(
+                f'{totals["users"]}/{options["users"]} users, '
+                f'{totals["recipes"]} recipes, {totals["links"]} links, '
+                f'{rows / seconds if seconds else 0:.0f} rows/s'
+            )
+
+        totals = datagen.generate(
+            options['users'],
+            options['recipes'],
+            options['tags'],
+            options['ingredients'],
+            links=options['links'],
+            skew=options['skew'],
+            seed=options['seed'],
+            report=report
+        )
+
+        summary = ', '.join(
+            f'{count} {name}' for name, count in totals.items()
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {summary} in {time.monotonic() - start:.1f}s'
+        ))
@@ -0,0 +1,143 @@
+import json
+import random
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe import loadtest
+
+
+def parse_mix(value):
+    """Parse a request mix given as kind=weight,kind=weight"""
+    mix = {}
+    for part in value.split(','):
+        kind, _, weight = part.partition('=')
+        if kind not in loadtest.REQUESTS:
+            raise CommandError('Unknown request kind {!r}, use {}'.format(
+                kind, ', '.join(loadtest.REQUESTS)))
+        try:
+            mix[kind] = float(weight)
+        except ValueError:
+            raise CommandError(f'Invalid weight for {kind}: {weight!r}')
+
+    return mix
+
+
+class Command(BaseCommand):
+    """Django command to load test a running server over HTTP"""
+    help = (
+        'Sign up users through the API of a running server, then send a '
+        'mix of requests from concurrent workers and report the throughput, '
+        'latency histogram and error rate.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='e.g. http://localhost:8000')
+        parser.add_argument('--users', type=int, default=4)
+        parser.add_argument(
+            '--recipes',
+            type=int,
+            default=100,
+            help='Recipes created for each user before the test'
+        )
+        parser.add_argument('--workers', type=int, default=16)
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=30,
+            help='Seconds to send requests for'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            help='Stop after this many requests'
+        )
+        parser.add_argument(
+            '--mix',
+            type=parse_mix,
+            default=loadtest.DEFAULT_MIX,
+            help='Relative weights, default {}'.format(','.join(
+                f'{kind}={weight}'
+                for kind, weight in loadtest.DEFAULT_MIX.items()
+            ))
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the load test users instead of deleting them'
+        )
+        parser.add_argument('--output', help='Write the summary as JSON')
+
+    def handle(self, *args, **options):
+        client = loadtest.Client(options['url'])
+        rng = random.Random(options['seed'])
+        # separate runs against the same server need their own emails
+        run_id = uuid.uuid4().hex[:8]
+
+        self.stdout.write(f'Creating {options["users"]} users...')
+        sessions = []
+        try:
+            for number in range(options['users']):
+                sessions.append(loadtest.create_session(
+                    client,
+                    f'loadtest-{run_id}-{number}@example.com',
+                    max(1, options['recipes']),
+                    rng
+                ))
+
+            self.stdout.write(
+                f'Running {options["workers"]} workers for up to '
+                f'{options["duration"]}s...'
+            )
+            results, seconds = loadtest.run(
+                options['url'],
+                sessions,
+                options['mix'],
+                options['workers'],
+                options['duration'],
+                requests=options['requests'],
+                seed=options['seed']
+            )
+        except (OSError, loadtest.RequestFailed) as error:
+            raise CommandError(f'Load test failed: {error}')
+        finally:
+            if not options['keep']:
+                self.delete_sessions(client, sessions)
+            client.close()
+
+        report = {'total': loadtest.summarize(results, seconds)}
+        for kind in options['mix']:
+            report[kind] = loadtest.summarize(
+                [result for result in results if result.kind == kind],
+                seconds
+            )
+        self.write_report(report)
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, indent=2)
+            self.stdout.write(f'Summary written to {options["output"]}')
+
+    def delete_sessions(self, client, sessions):
+        """Close the load test accounts, purging their data"""
+        for session in sessions:
+            try:
+                client.request('DELETE', '/api/user/me/', session.token)
+            except OSError as error:
+                self.stderr.write(f'Could not delete {session.email}: {error}')
+
+    def write_report(self, report):
+        """Print the summaries and the overall latency histogram"""
+        for kind, summary in report.items():
+            self.stdout.write(f'{kind}: ' + ', '.join(
+                f'{key}={value}' for key, value in summary.items()
+                if key != 'histogram'
+            ))
+
+        histogram = report['total']['histogram']
+        most = max(histogram.values()) or 1
+        for label, count in histogram.items():
+            self.stdout.write(
+                f'{label:>9} {count:>8} {"#" * round(40 * count / most)}')
+        self.stdout.write(self.style.SUCCESS('Load test complete'))
@@ -0,0 +1,206 @@
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+from rest_framework.response import Response
+
+
+def estimate_count(queryset):
+    """Return the planner's row estimate for a queryset"""
+    # postgres can estimate the result size from table statistics
+    # without scanning, other databases fall back to an exact count
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class KeysetCursorPagination(CursorPagination):
+    """Cursor pagination positioned on every field of the ordering"""
+    # DRF positions cursors on the first ordering field only and steps over
+    # rows sharing its value with an offset, which gets slow when many rows
+    # tie, e.g. on price. Orderings here end with the unique id, so the
+    # full position of a row is unique and no offset is needed.
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for field in ordering:
+            name = field.lstrip('-')
+            if isinstance(instance, dict):
+                values.append(str(instance[name]))
+            else:
+                values.append(str(getattr(instance, name)))
+
+        return json.dumps(values, separators=(',', ':'))
+
+    def _ordering_field(self, queryset, name):
+        """Return the model field or annotation the ordering sorts on"""
+        annotation = queryset.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field
+
+        return queryset.model._meta.get_field(name)
+
+    def keyset_filter(self, position, reverse, queryset):
+        """Return the filter for rows after a position in the ordering"""
+        try:
+            values = json.loads(position)
+        except ValueError:
+            values = None
+        if not isinstance(values, list):
+            # cursors from before positions covered the whole ordering
+            values = [position]
+
+        fields = [
+            (field.lstrip('-'), 'lt' if reverse != field.startswith('-')
+             else 'gt')
+            for field in self.ordering[:len(values)]
+        ]
+        # a tampered cursor would otherwise fail in the query
+        try:
+            values = [
+                self._ordering_field(queryset, name).to_python(value)
+                for (name, _), value in zip(fields, values)
+            ]
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        # (a, b) after (x, y) is a > x or (a = x and b > y)
+        after = Q()
+        ties = {}
+        for (name, lookup), value in zip(fields, values):
+            after |= Q(**ties, **{f'{name}__{lookup}': value})
+            ties[name] = value
+        if len(fields) > 1:
+            # a bound on the leading field alone lets an index seek to it
+            name, lookup = fields[0]
+            after &= Q(**{f'{name}__{lookup}e': values[0]})
+
+        return after
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # as in CursorPagination, apart from filtering with keyset_filter
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            queryset = queryset.filter(
+                self.keyset_filter(current_position, reverse, queryset)
+            )
+
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+
+class EstimatedCountCursorPagination(KeysetCursorPagination):
+    """Keyset pagination that can include an estimated total count"""
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    # ?count=estimate adds the planner's estimated total to the response
+    count_query_param = 'count'
+    count_query_value = 'estimate'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        requested = request.query_params.get(self.count_query_param)
+        if requested == self.count_query_value:
+            self.count = estimate_count(queryset)
+
+        return super().paginate_queryset(queryset, request, view=view)
+
+    def get_ordering(self, request, queryset, view):
+        # views may order a request differently, e.g. by search rank
+        get_ordering = getattr(view, 'get_ordering', None)
+        ordering = get_ordering() if get_ordering is not None else None
+        if ordering:
+            return ordering
+
+        return super().get_ordering(request, queryset, view)
+
+    def get_paginated_response(self, data):
+        fields = [
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+        ]
+        if self.count is not None:
+            fields.append(('count', self.count))
+        fields.append(('results', data))
+
+        return Response(OrderedDict(fields))
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count'] = {
+            'type': 'integer',
+            'example': 123,
+        }
+
+        return response_schema
+
+
+class RecipeCursorPagination(EstimatedCountCursorPagination):
+    """Paginate recipes newest first"""
+    ordering = '-id'
+
+
+class NameCursorPagination(EstimatedCountCursorPagination):
+    """Paginate tags and ingredients in reverse name order"""
+    # id breaks ties between objects that share a name
+    ordering = ('-name', '-id')
@@ -0,0 +1,101 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, \
+    TrigramSimilarity
+from django.db import connections
+from django.db.models import Case, F, FloatField, IntegerField, Q, Value, \
+    When
+from django.db.models.functions import Cast
+
+# must match the configuration used by the trigger in core migration 0009
+SEARCH_CONFIG = 'english'
+
+# pg_trgm's default similarity_threshold, used by trigram_similar
+TRIGRAM_THRESHOLD = 0.3
+
+_WORDS = re.compile(r'[^\W_]+')
+
+
+def trigrams(text):
+    """Return the trigrams pg_trgm extracts from a string"""
+    grams = set()
+    for word in _WORDS.findall(text.lower()):
+        # pg_trgm pads each word with two spaces before and one after
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+
+    return grams
+
+
+def trigram_similarity(a, b):
+    """Return the similarity pg_trgm's similarity() gives two strings"""
+    a, b = trigrams(a), trigrams(b)
+    if not a or not b:
+        return 0.0
+
+    return len(a & b) / len(a | b)
+
+
+def search_recipes(queryset, terms):
+    """Filter recipes by name, annotating each with its relevance"""
+    # name_match puts exact and then prefix matches of the whole terms
+    # first on every database, rank orders the rest
+    name_match = Case(
+        When(name__iexact=terms, then=Value(2)),
+        When(name__istartswith=terms, then=Value(1)),
+        default=Value(0),
+        output_field=IntegerField()
+    )
+    if connections[queryset.db].vendor == 'postgresql':
+        query = SearchQuery(terms, config=SEARCH_CONFIG)
+        # ts_rank returns a real, as a double precision its value survives
+        # the round trip through a pagination cursor unchanged
+        return queryset.filter(search_vector=query).annotate(
+            name_match=name_match,
+            rank=Cast(
+                SearchRank(F('search_vector'), query), FloatField())
+        )
+
+    # other databases match every word as a substring of the name
+    words = terms.split()
+    if not words:
+        return queryset.none()
+
+    matches = Q()
+    for word in words:
+        matches &= Q(name__icontains=word)
+
+    return queryset.filter(matches).annotate(
+        name_match=name_match,
+        rank=Value(0.0, output_field=FloatField())
+    )
+
+
+def autocomplete(queryset, q, limit):
+    """Return the top names starting with or close to q, best first"""
+    if connections[queryset.db].vendor == 'postgresql':
+        # both conditions are served by the per user prefix and trigram
+        # indexes from core migration 0010
+        matches = queryset.filter(
+            Q(name__istartswith=q) | Q(name__trigram_similar=q)
+        ).annotate(similarity=TrigramSimilarity('name', q))
+    else:
+        # without pg_trgm, score the user's names the way it would
+        lowered = q.lower()
+        scores = {}
+        for pk, name in queryset.values_list('pk', 'name'):
+            similarity = trigram_similarity(q, name)
+            if name.lower().startswith(lowered) or \
+                    similarity >= TRIGRAM_THRESHOLD:
+                scores[pk] = similarity
+        matches = queryset.filter(pk__in=scores).annotate(similarity=Case(
+            *[When(pk=pk, then=Value(score)) for pk, score in scores.items()],
+            default=Value(0.0),
+            output_field=FloatField()
+        ))
+
+    return matches.annotate(prefix=Case(
+        When(name__istartswith=q, then=Value(1)),
+        default=Value(0),
+        output_field=IntegerField()
+    )).order_by('-prefix', '-similarity', 'name', 'id')[:limit]
@@ -1,7 +1,167 @@
+from collections.abc import Iterable, Mapping
+
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.relations import ManyRelatedField, MANY_RELATION_KWARGS
 
 from core.models import Tag, Ingredient, Recipe
 
+from recipe import bulk
+
+
+def split_query_param(request, name):
+    """Return the comma separated values of a query param as a set"""
+    value = request.query_params.get(name)
+    if value is None:
+        return None
+
+    return {item.strip() for item in value.split(',') if item.strip()}
+
+
+class FieldSelectionMixin:
+    """Select output fields with ?fields= and inline objects with ?expand="""
+    # maps a related field name to the serializer used to expand it
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # only reads can reshape the output, writes keep the full fields
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return
+
+        selected = split_query_param(request, 'fields')
+        if selected is not None:
+            for name in set(self.fields) - selected:
+                self.fields.pop(name)
+
+        for name in split_query_param(request, 'expand') or ():
+            if name in self.fields and name in self.expandable_fields:
+                self.fields[name] = self.expandable_fields[name](
+                    many=True,
+                    read_only=True
+                )
+
+
+class OwnedManyRelatedField(ManyRelatedField):
+    """Many related field resolving all submitted ids with one query"""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        child = self.child_relation
+        values = [child.parse(item) for item in data]
+        ids = {value for value in values if not isinstance(value, str)}
+        # resolved for every item at once by a list serializer, otherwise
+        # one IN query instead of a SELECT per id
+        found = self.context.get('owned_objects', {}).get(self.field_name)
+        if found is None:
+            found = child.get_queryset().in_bulk(ids) if ids else {}
+        for value in values:
+            if not isinstance(value, str) and value not in found:
+                child.fail('does_not_exist', pk_value=value)
+
+        return [
+            value if isinstance(value, str) else found[value]
+            for value in values
+        ]
+
+
+class OwnedListSerializer(serializers.ListSerializer):
+    """List serializer resolving the ids of every item in one query"""
+    # per relation, instead of one query per item, see OwnedManyRelatedField
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self._context['owned_objects'] = {
+                name: self._resolve(field, data)
+                for name, field in self.child.fields.items()
+                if isinstance(field, OwnedManyRelatedField)
+                and not field.read_only
+            }
+
+        return super().to_internal_value(data)
+
+    def _resolve(self, field, data):
+        """Return the submitted objects of a relation by primary key"""
+        child = field.child_relation
+        ids = set()
+        for item in data:
+            values = item.get(field.field_name) \
+                if isinstance(item, Mapping) else None
+            if isinstance(values, str) or not isinstance(values, Iterable):
+                continue
+            for value in values:
+                try:
+                    value = child.parse(value)
+                except serializers.ValidationError:
+                    # reported by the item's own validation
+                    continue
+                if not isinstance(value, str):
+                    ids.add(value)
+
+        return child.get_queryset().in_bulk(ids) if ids else {}
+
+
+class NameOrPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Related field taking an id of the user's objects or a new name"""
+    # names are resolved in bulk when saving, see recipe.bulk.resolve_names
+    default_error_messages = {
+        'blank': 'Names may not be blank.',
+        'max_length': 'Ensure names have no more than {max_length} '
+                      'characters.',
+    }
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+
+        return OwnedManyRelatedField(**list_kwargs)
+
+    def get_queryset(self):
+        """Limit the objects that can be referenced to the user's own"""
+        queryset = super().get_queryset()
+        request = self.context.get('request')
+        if request is not None and request.user.is_authenticated:
+            queryset = queryset.filter(user=request.user)
+
+        return queryset
+
+    def parse(self, data):
+        """Return a stripped name, or the primary key of an object"""
+        # digit strings are ids, as sent by form encoded requests
+        if isinstance(data, str) and not data.strip().isdigit():
+            name = data.strip()
+            if not name:
+                self.fail('blank')
+            max_length = self.queryset.model._meta.get_field(
+                'name').max_length
+            if len(name) > max_length:
+                self.fail('max_length', max_length=max_length)
+            return name
+
+        if self.pk_field is not None:
+            data = self.pk_field.to_internal_value(data)
+        try:
+            return self.queryset.model._meta.pk.to_python(data)
+        except DjangoValidationError:
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+    def to_internal_value(self, data):
+        value = self.parse(data)
+        if isinstance(value, str):
+            return value
+
+        return super().to_internal_value(value)
+
 
 class TagSerializer(serializers.ModelSerializer):
     """Serializer for tag objects"""
@@ -23,15 +183,20 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(FieldSelectionMixin, serializers.ModelSerializer):
     """Serializer for Recipe object"""
     # after we finish creating this serializer, we implement the view
-    ingredients = serializers.PrimaryKeyRelatedField(
+    expandable_fields = {
+        'tags': TagSerializer,
+        'ingredients': IngredientSerializer,
+    }
+
+    ingredients = NameOrPrimaryKeyRelatedField(
         many=True,
         queryset=Ingredient.objects.all()
     )
 
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = NameOrPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all()
     )
@@ -45,6 +210,17 @@ class RecipeSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'time_minutes', 'price',
                   'link', 'tags', 'ingredients')
         read_only_fields = ('id',)
+        list_serializer_class = OwnedListSerializer
+
+    def create(self, validated_data):
+        bulk.resolve_names(validated_data['user'], [validated_data])
+
+        return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        bulk.resolve_names(instance.user, [validated_data])
+
+        return super().update(instance, validated_data)
 
 
 class RecipeDetailSerializer(RecipeSerializer):
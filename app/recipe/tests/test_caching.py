@@ -0,0 +1,182 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase, override_settings
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def detail_url(recipe_id):
+    """Return a recipe detail URL"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def sample_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        'name': 'Beef chow fun',
+        'time_minutes': 30,
+        'price': 18.00,
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+@override_settings(RESPONSE_CACHE=True)
+class ConditionalGetTests(TestCase):
+    """Test conditional requests and response caching"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com',
+            password='test123456',
+            name='Test Name'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_list_has_validators(self):
+        """Test list responses include an ETag and Last-Modified"""
+        sample_recipe(user=self.user)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('ETag', res)
+        self.assertIn('Last-Modified', res)
+        self.assertIn('private', res['Cache-Control'])
+
+    def test_if_none_match_not_modified(self):
+        """Test a matching If-None-Match returns 304 without queries"""
+        sample_recipe(user=self.user)
+        res = self.client.get(RECIPES_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(
+                RECIPES_URL,
+                HTTP_IF_NONE_MATCH=res['ETag']
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertFalse(res.content)
+
+    def test_if_modified_since_not_modified(self):
+        """Test a current If-Modified-Since returns 304"""
+        sample_recipe(user=self.user)
+        res = self.client.get(RECIPES_URL)
+
+        res = self.client.get(
+            RECIPES_URL,
+            HTTP_IF_MODIFIED_SINCE=res['Last-Modified']
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_repeated_read_served_from_cache(self):
+        """Test repeating a read does not query the database"""
+        sample_recipe(user=self.user)
+        first = self.client.get(RECIPES_URL)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(RECIPES_URL)
+
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_etag_varies_by_query(self):
+        """Test different query strings get different ETags"""
+        sample_recipe(user=self.user)
+
+        res1 = self.client.get(RECIPES_URL)
+        res2 = self.client.get(RECIPES_URL, {'fields': 'id'})
+
+        self.assertNotEqual(res1['ETag'], res2['ETag'])
+        self.assertEqual(list(res2.data['results'][0]), ['id'])
+
+    def test_write_invalidates(self):
+        """Test creating a recipe changes the ETag and cached list"""
+        sample_recipe(user=self.user)
+        res = self.client.get(RECIPES_URL)
+        etag = res['ETag']
+
+        self.client.post(RECIPES_URL, {
+            'name': 'Mapo Tofu',
+            'time_minutes': 15,
+            'price': 11.50,
+        })
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+        self.assertEqual(len(res.data['results']), 2)
+
+    def test_tag_change_invalidates_recipe_detail(self):
+        """Test tagging a recipe invalidates its cached detail"""
+        recipe = sample_recipe(user=self.user)
+        res = self.client.get(detail_url(recipe.id))
+        etag = res['ETag']
+
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Noodles'))
+        res = self.client.get(detail_url(recipe.id), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'][0]['name'], 'Noodles')
+
+    def test_tag_list_invalidated(self):
+        """Test creating a tag invalidates the cached tag list"""
+        Tag.objects.create(user=self.user, name='Breakfast')
+        self.client.get(TAGS_URL)
+
+        self.client.post(TAGS_URL, {'name': 'Lunch'})
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(len(res.data['results']), 2)
+
+    def test_cache_limited_to_user(self):
+        """Test cached responses are not shared between users"""
+        sample_recipe(user=self.user)
+        self.client.get(RECIPES_URL)
+
+        user2 = get_user_model().objects.create_user(
+            email='test1@gmail.com',
+            password='test123456'
+        )
+        self.client.force_authenticate(user2)
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+
+class ProcessLocalCacheTests(TestCase):
+    """Test responses are not cached without a shared cache"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com',
+            password='test123456',
+            name='Test Name'
+        )
+        self.client.force_authenticate(self.user)
+
+    @override_settings(RESPONSE_CACHE=False)
+    def test_no_validators_or_cache(self):
+        """Test reads carry no ETag and always run the view"""
+        sample_recipe(user=self.user)
+
+        with patch('recipe.caching.cache') as cache:
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        cache.get.assert_not_called()
+        cache.set.assert_not_called()
+        self.assertNotIn('ETag', res)
+        self.assertNotIn('Last-Modified', res)
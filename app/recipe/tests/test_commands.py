@@ -0,0 +1,182 @@
+import json
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command, CommandError
+from django.test import LiveServerTestCase, TestCase, override_settings
+
+from core.models import Tag, Recipe
+
+from recipe import endpoint_benchmarks, urls as recipe_urls
+from user import urls as user_urls
+
+
+class BenchmarkCommandTests(TestCase):
+
+    def run_benchmark(self, scenario):
+        """Run a benchmark scenario on a small dataset"""
+        out = StringIO()
+        call_command('benchmark', scenario, recipes=20, repeat=1, stdout=out)
+
+        return out.getvalue()
+
+    def test_benchmark_serializers(self):
+        """Test the serializer benchmark runs and leaves no data behind"""
+        output = self.run_benchmark('serializers')
+
+        self.assertIn('speedup=', output)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_benchmark_filters(self):
+        """Test the filter benchmark reports query plans"""
+        output = self.run_benchmark('filters')
+
+        self.assertIn('name=all of 10 tags', output)
+        self.assertIn('plan=', output)
+
+    def test_benchmark_orderings(self):
+        """Test the ordering benchmark compares keyset and offset pages"""
+        output = self.run_benchmark('orderings')
+
+        self.assertIn('name=price, ', output)
+        self.assertIn('keyset_deep_ms=', output)
+        self.assertIn('offset_deep_ms=', output)
+
+
+class GenerateDataCommandTests(TestCase):
+
+    def generate(self):
+        """Generate a small skewed dataset"""
+        call_command(
+            'generate_data',
+            users=5,
+            recipes=60,
+            tags=20,
+            ingredients=30,
+            seed=3,
+            stdout=StringIO()
+        )
+
+    def snapshot(self):
+        """Return the generated data without ids"""
+        return {
+            'recipes': list(Recipe.objects.order_by('id').values_list(
+                'user__email', 'name', 'time_minutes', 'price')),
+            'tags': list(Tag.objects.order_by('id').values_list(
+                'user__email', 'name', 'recipe_count')),
+        }
+
+    def test_generate_data_skewed(self):
+        """Test earlier users get more recipes and counters are set"""
+        self.generate()
+
+        users = get_user_model().objects.order_by('id')
+        counts = [user.recipe_set.count() for user in users]
+        self.assertEqual(len(counts), 5)
+        self.assertEqual(counts, sorted(counts, reverse=True))
+        self.assertGreater(counts[0], counts[-1])
+        for tag in Tag.objects.all():
+            self.assertEqual(tag.recipe_count, tag.recipe_set.count())
+
+    def test_generate_data_reproducible(self):
+        """Test the same seed generates the same data"""
+        self.generate()
+        first = self.snapshot()
+        get_user_model().objects.all().delete()
+
+        self.generate()
+
+        self.assertEqual(self.snapshot(), first)
+
+
+class BenchmarkEndpointsCommandTests(TestCase):
+
+    def test_every_route_benchmarked(self):
+        """Test every recipe and user route has an endpoint benchmark"""
+        routes = {
+            f'recipe:{pattern.name}'
+            for pattern in recipe_urls.router.urls
+        } | {f'user:{pattern.name}' for pattern in user_urls.urlpatterns}
+
+        benchmarked = {
+            endpoint.url_name for endpoint in endpoint_benchmarks.ENDPOINTS
+        }
+
+        self.assertEqual(benchmarked, routes)
+
+    def test_benchmark_endpoints_baseline(self):
+        """Test results are written as JSON and checked against a baseline"""
+        with tempfile.NamedTemporaryFile('w+', suffix='.json') as output:
+            call_command(
+                'benchmark_endpoints',
+                sizes=[5],
+                repeat=2,
+                output=output.name,
+                stdout=StringIO()
+            )
+            report = json.load(output)
+            self.assertEqual(
+                len(report['results']),
+                len(endpoint_benchmarks.ENDPOINTS)
+            )
+            self.assertFalse(Recipe.objects.exists())
+
+            # one query fewer in the baseline is a regression
+            report['results'][0]['queries'] -= 1
+            output.seek(0)
+            output.truncate()
+            json.dump(report, output)
+            output.flush()
+            with self.assertRaisesMessage(CommandError, '1 regressions'):
+                call_command(
+                    'benchmark_endpoints',
+                    sizes=[5],
+                    repeat=2,
+                    only=[report['results'][0]['endpoint']],
+                    baseline=output.name,
+                    latency_tolerance=100,
+                    memory_tolerance=100,
+                    stdout=StringIO(),
+                    stderr=StringIO()
+                )
+
+    @override_settings(RESPONSE_CACHE=True)
+    def test_reads_not_served_from_cache(self):
+        """Test repeated reads run the view's queries every time"""
+        endpoints = [
+            endpoint for endpoint in endpoint_benchmarks.ENDPOINTS
+            if endpoint.name == 'list recipes'
+        ]
+
+        report = endpoint_benchmarks.run([5], 3, endpoints=endpoints)
+
+        # the token, then the recipes with their tags and ingredients
+        self.assertEqual(report['results'][0]['queries'], 4)
+
+
+class LoadTestCommandTests(LiveServerTestCase):
+
+    def test_loadtest(self):
+        """Test a small load test signs up users and reports every kind"""
+        out = StringIO()
+        with tempfile.TemporaryDirectory() as media, override_settings(
+                MEDIA_ROOT=media, ACCOUNT_PURGE_IN_BACKGROUND=False):
+            call_command(
+                'loadtest',
+                self.live_server_url,
+                users=2,
+                recipes=3,
+                workers=1,
+                requests=30,
+                stdout=out
+            )
+
+        output = out.getvalue()
+        self.assertIn('total: requests=30,', output)
+        self.assertIn('error_rate=0.0,', output)
+        for kind in ('list', 'detail', 'filter', 'create', 'upload'):
+            self.assertIn(f'{kind}: requests=', output)
+        # the load test accounts are purged afterwards
+        self.assertFalse(get_user_model().objects.exists())
+        self.assertFalse(Recipe.objects.exists())
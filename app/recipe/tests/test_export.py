@@ -0,0 +1,156 @@
+import csv
+import io
+import json
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+
+from recipe.export import snapshot_rows
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+class RecipeExportTests(TestCase):
+    """Test streaming exports of a user's recipes"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'test123456'
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Spicy')
+        self.ingredient = Ingredient.objects.create(
+            user=self.user, name='Chilli')
+        self.recipes = []
+        for i in range(5):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                name=f'Recipe {i}',
+                time_minutes=10,
+                price=4.50
+            )
+            recipe.tags.add(self.tag)
+            if i % 2:
+                recipe.ingredients.add(self.ingredient)
+            self.recipes.append(recipe)
+
+    def export(self, **params):
+        """Return the streamed body of an export"""
+        res = self.client.get(EXPORT_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+
+        return b''.join(res.streaming_content).decode()
+
+    def test_export_ndjson(self):
+        """Test recipes are exported one JSON document per line"""
+        lines = self.export().splitlines()
+
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(json.loads(lines[1]), {
+            'id': self.recipes[1].id,
+            'name': 'Recipe 1',
+            'time_minutes': 10,
+            'price': '4.50',
+            'link': '',
+            'tags': ['Spicy'],
+            'ingredients': ['Chilli'],
+        })
+
+    def test_export_csv(self):
+        """Test recipes are exported as CSV with a header row"""
+        rows = list(csv.DictReader(io.StringIO(self.export(output='csv'))))
+
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0]['name'], 'Recipe 0')
+        self.assertEqual(json.loads(rows[0]['tags']), ['Spicy'])
+        self.assertEqual(json.loads(rows[0]['ingredients']), [])
+
+    def test_export_limited_to_user(self):
+        """Test only the user's own recipes are exported"""
+        other = get_user_model().objects.create_user(
+            'other@gmail.com',
+            'test123456'
+        )
+        Recipe.objects.create(
+            user=other, name='Not mine', time_minutes=5, price=1.00)
+
+        self.assertNotIn('Not mine', self.export())
+
+    def test_export_filtered(self):
+        """Test exports apply the list filters"""
+        lines = self.export(
+            ingredients=str(self.ingredient.id)).splitlines()
+
+        self.assertEqual(len(lines), 2)
+
+    @patch('recipe.views.RecipeViewSet.export_chunk_size', 2)
+    def test_export_queries_per_chunk(self):
+        """Test relations are fetched once per chunk of recipes"""
+        with CaptureQueriesContext(connection) as context:
+            self.export()
+
+        selects = [
+            query for query in context.captured_queries
+            if query['sql'].startswith('SELECT')
+        ]
+        # the recipes, then tags and ingredients for 3 chunks
+        self.assertEqual(len(selects), 1 + 3 * 2)
+
+    def test_export_invalid_output(self):
+        """Test unknown export formats are rejected"""
+        res = self.client.get(EXPORT_URL, {'output': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'needs PostgreSQL')
+class SnapshotRowsTests(TransactionTestCase):
+    """Test the isolation of exports on PostgreSQL"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'test123456'
+        )
+        Recipe.objects.create(
+            user=self.user, name='Recipe', time_minutes=10, price=4.50)
+
+    def isolation_level(self, queryset):
+        """Return the isolation level an export's rows were read in"""
+        levels = []
+        for _ in snapshot_rows(queryset, 10):
+            with connection.cursor() as cursor:
+                cursor.execute('SHOW transaction_isolation')
+                levels.append(cursor.fetchone()[0])
+
+        return levels[0]
+
+    def test_outermost_transaction_repeatable_read(self):
+        """Test an export on its own reads from one snapshot"""
+        queryset = Recipe.objects.filter(user=self.user).order_by('id')
+
+        self.assertEqual(self.isolation_level(queryset), 'repeatable read')
+
+    def test_inside_transaction_keeps_snapshot(self):
+        """Test an export inside a transaction runs in that transaction"""
+        queryset = Recipe.objects.filter(user=self.user).order_by('id')
+        with transaction.atomic():
+            Recipe.objects.create(
+                user=self.user, name='Unsaved', time_minutes=5, price=1.00)
+
+            rows = list(snapshot_rows(queryset, 10))
+
+        self.assertEqual(len(rows), 2)
@@ -0,0 +1,97 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+from recipe.fastpath import ValuesPlan
+from recipe.serializers import RecipeSerializer, RecipeDetailSerializer, \
+    RecipeImageSerializer, TagSerializer
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class ValuesPlanTests(TestCase):
+    """Test building list output from values rows"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com',
+            password='test123456',
+            name='Test Name'
+        )
+        self.client.force_authenticate(self.user)
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ('Cantonese', 'Noodles', 'Breakfast')
+        ]
+        ingredient = Ingredient.objects.create(
+            user=self.user, name='Rice noodles'
+        )
+        recipe = Recipe.objects.create(
+            user=self.user,
+            name='Beef chow fun',
+            time_minutes=30,
+            price=18,
+            link='https://example.com/chow-fun'
+        )
+        recipe.tags.add(tags[2], tags[0])
+        recipe.ingredients.add(ingredient)
+        Recipe.objects.create(
+            user=self.user,
+            name='Mapo Tofu',
+            time_minutes=15,
+            price=11.5
+        )
+
+    def render(self, serializer, queryset):
+        """Render a queryset through a values plan"""
+        plan = ValuesPlan.for_serializer(serializer)
+        rows = list(plan.values(queryset))
+        return JSONRenderer().render(plan.serialize(rows, queryset.db))
+
+    def test_recipe_output_identical(self):
+        """Test values output is byte identical to RecipeSerializer"""
+        recipes = Recipe.objects.order_by('-id')
+        expected = JSONRenderer().render(
+            RecipeSerializer(recipes, many=True).data
+        )
+
+        self.assertEqual(self.render(RecipeSerializer(), recipes), expected)
+
+    def test_nested_output_identical(self):
+        """Test nested values output is byte identical to the detail"""
+        recipes = Recipe.objects.order_by('-id')
+        expected = JSONRenderer().render(
+            RecipeDetailSerializer(recipes, many=True).data
+        )
+
+        self.assertEqual(
+            self.render(RecipeDetailSerializer(), recipes),
+            expected
+        )
+
+    def test_tag_output_identical(self):
+        """Test values output is byte identical to TagSerializer"""
+        tags = Tag.objects.order_by('-name')
+        expected = JSONRenderer().render(TagSerializer(tags, many=True).data)
+
+        self.assertEqual(self.render(TagSerializer(), tags), expected)
+
+    def test_unsupported_serializer(self):
+        """Test serializers with unsupported fields have no plan"""
+        self.assertIsNone(ValuesPlan.for_serializer(RecipeImageSerializer()))
+
+    def test_list_endpoint_matches_serializer(self):
+        """Test the recipe list endpoint output matches the serializer"""
+        res = self.client.get(RECIPES_URL)
+
+        recipes = Recipe.objects.order_by('-id')
+        expected = JSONRenderer().render(
+            RecipeSerializer(recipes, many=True).data
+        )
+        self.assertEqual(JSONRenderer().render(res.data['results']), expected)
@@ -0,0 +1,162 @@
+from django.core.cache import cache
+from django.db import connection
+from django.urls import reverse
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+from core.querycache import get_backend
+from core.tests.utils import explain, plan_matches, \
+    SEQUENTIAL_SCAN_PATTERNS, SORT_PATTERNS
+
+from recipe.benchmarks import seed_recipes
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+class QueryPlanTests(TestCase):
+    """Test endpoint queries are served by indexes on a seeded dataset"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_recipes(300, tags=30, ingredients=60, seed=1)
+        # other users' rows make a per user index worth using
+        for seed in range(2, 5):
+            seed_recipes(300, tags=30, ingredients=60, seed=seed)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        cls.tag_ids = list(
+            Tag.objects.filter(user=cls.user).values_list('id', flat=True)
+        )
+        cls.ingredient_ids = list(
+            Ingredient.objects.filter(user=cls.user).values_list(
+                'id', flat=True)
+        )
+        cls.recipe = Recipe.objects.filter(user=cls.user).first()
+
+    def setUp(self):
+        # cached responses or rows would hide the queries
+        cache.clear()
+        get_backend().clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def capture(self, url, params=None):
+        """Return the SELECT queries run by a GET request"""
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].lstrip().upper().startswith('SELECT')
+        ]
+
+    def assertIndexDriven(self, url, params=None):
+        """Fail if any query of a request scans a table sequentially"""
+        queries = self.capture(url, params)
+        self.assertTrue(queries)
+        for sql in queries:
+            lines = explain(sql)
+            scans = plan_matches(lines, SEQUENTIAL_SCAN_PATTERNS)
+            self.assertFalse(
+                scans,
+                f'Sequential scan in plan for:\n{sql}\n' + '\n'.join(lines)
+            )
+
+        return queries
+
+    def assertIndexOrdered(self, sql):
+        """Fail if a query sorts rows instead of reading them in order"""
+        lines = explain(sql)
+        self.assertFalse(
+            plan_matches(lines, SORT_PATTERNS),
+            f'Sort in plan for:\n{sql}\n' + '\n'.join(lines)
+        )
+
+    def test_recipe_list(self):
+        """Test the first page of recipes is read from an index in order"""
+        queries = self.assertIndexDriven(RECIPES_URL)
+        self.assertIndexOrdered(queries[0])
+
+    def test_recipe_list_next_page(self):
+        """Test a following page seeks to its cursor in the index"""
+        res = self.client.get(RECIPES_URL, {'page_size': 20})
+        queries = self.assertIndexDriven(res.data['next'])
+        self.assertIndexOrdered(queries[0])
+
+    def test_recipe_list_by_price(self):
+        """Test pages ordered by price are read in index order"""
+        res = self.client.get(RECIPES_URL, {
+            'ordering': 'price', 'page_size': 20,
+        })
+        queries = self.assertIndexDriven(res.data['next'])
+        self.assertIndexOrdered(queries[0])
+
+    def test_recipe_list_by_time_in_range(self):
+        """Test a time range ordered by time uses its index"""
+        queries = self.assertIndexDriven(RECIPES_URL, {
+            'ordering': '-time_minutes', 'time_max': 60,
+        })
+        self.assertIndexOrdered(queries[0])
+
+    def test_recipe_filter_any(self):
+        """Test filtering by any of several tags uses indexes"""
+        self.assertIndexDriven(RECIPES_URL, {
+            'tags': ','.join(map(str, self.tag_ids[:5])),
+        })
+
+    def test_recipe_filter_all(self):
+        """Test filtering by all of several tags uses indexes"""
+        self.assertIndexDriven(RECIPES_URL, {
+            'tags': ','.join(map(str, self.tag_ids[:2])),
+            'tags_match': 'all',
+        })
+
+    def test_recipe_filter_exclude(self):
+        """Test excluding ingredients uses indexes"""
+        self.assertIndexDriven(RECIPES_URL, {
+            'ingredients_exclude': ','.join(
+                map(str, self.ingredient_ids[:5])),
+        })
+
+    def test_recipe_search(self):
+        """Test searching recipes uses the search index"""
+        self.assertIndexDriven(RECIPES_URL, {'search': 'recipe 12'})
+
+    def test_recipe_detail(self):
+        """Test retrieving a recipe uses indexes"""
+        self.assertIndexDriven(
+            reverse('recipe:recipe-detail', args=[self.recipe.id])
+        )
+
+    def test_tag_list(self):
+        """Test the tag list is read from an index in order"""
+        queries = self.assertIndexDriven(TAGS_URL)
+        self.assertIndexOrdered(queries[0])
+
+    def test_tag_list_assigned_only(self):
+        """Test listing assigned tags only uses indexes"""
+        self.assertIndexDriven(TAGS_URL, {'assigned_only': 1})
+
+    def test_tag_list_by_usage(self):
+        """Test tags ordered by usage are read in index order"""
+        queries = self.assertIndexDriven(TAGS_URL, {
+            'ordering': '-usage', 'min_usage': 1,
+        })
+        self.assertIndexOrdered(queries[0])
+
+    def test_ingredient_list(self):
+        """Test the ingredient list is read from an index in order"""
+        queries = self.assertIndexDriven(INGREDIENTS_URL)
+        self.assertIndexOrdered(queries[0])
+
+    def test_ingredient_autocomplete(self):
+        """Test autocompleting ingredients uses indexes"""
+        self.assertIndexDriven(INGREDIENTS_URL, {'q': 'ingredient 1'})
@@ -1,20 +1,32 @@
 import tempfile
 import os
+from base64 import b64encode
+from urllib.parse import urlencode
 
 from PIL import Image
 
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework import status
-from rest_framework.test import APIClient
+from rest_framework.test import APIClient, APIRequestFactory
 
 from core.models import Recipe, Tag, Ingredient
+from core.tests.utils import QueryBudgetMixin
 
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 
 RECIPES_URL = reverse('recipe:recipe-list')
+BULK_URL = reverse('recipe:recipe-bulk')
+
+# maximum number of queries each endpoint may run, whatever the result size
+QUERY_BUDGETS = {
+    'recipe-list': 3,
+    'recipe-detail': 3,
+}
 
 
 def image_upload_url(recipe_id):
@@ -95,7 +107,7 @@ class PrivateRecipeApiTests(TestCase):
         recipes = Recipe.objects.all().order_by('-id')
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipes_limited_to_user(self):
         """Test retrieving user specific list"""
@@ -120,8 +132,83 @@ class PrivateRecipeApiTests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
-        self.assertEqual(len(res.data), 2)
+        self.assertEqual(res.data['results'], serializer.data)
+        self.assertEqual(len(res.data['results']), 2)
+
+    def test_recipe_list_paginated(self):
+        """Test recipes are paginated newest first with cursor links"""
+        recipes = [
+            sample_recipe(user=self.user, name=f'Recipe {i}')
+            for i in range(5)
+        ]
+
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [recipe['id'] for recipe in res.data['results']],
+            [recipes[4].id, recipes[3].id]
+        )
+        self.assertIsNone(res.data['previous'])
+        self.assertNotIn('count', res.data)
+
+        res = self.client.get(res.data['next'])
+
+        self.assertEqual(
+            [recipe['id'] for recipe in res.data['results']],
+            [recipes[2].id, recipes[1].id]
+        )
+        self.assertIsNotNone(res.data['previous'])
+
+    def test_recipe_list_estimated_count(self):
+        """Test requesting an estimated total count of recipes"""
+        sample_recipe(user=self.user)
+        sample_recipe_2(user=self.user)
+
+        res = self.client.get(RECIPES_URL, {'count': 'estimate'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['count'], 2)
+
+    def test_recipe_list_sparse_fields(self):
+        """Test selecting recipe list output fields"""
+        recipe = sample_recipe(user=self.user)
+        recipe.tags.add(sample_tag(user=self.user))
+
+        res = self.client.get(RECIPES_URL, {'fields': 'id,name,time_minutes'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [{
+            'id': recipe.id,
+            'name': recipe.name,
+            'time_minutes': recipe.time_minutes,
+        }])
+
+    def test_recipe_list_expand_related(self):
+        """Test expanding tags and ingredients on the recipe list"""
+        recipe = sample_recipe(user=self.user)
+        recipe.tags.add(sample_tag(user=self.user))
+        recipe.ingredients.add(sample_ingredient(user=self.user))
+
+        res = self.client.get(RECIPES_URL, {'expand': 'tags,ingredients'})
+
+        serializer = RecipeDetailSerializer(recipe)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [serializer.data])
+
+    def test_expand_ignored_on_create(self):
+        """Test expand does not change the fields accepted on create"""
+        tag = sample_tag(user=self.user)
+        payload = {
+            'name': 'Beef chow fun',
+            'tags': [tag.id],
+            'time_minutes': 30,
+            'price': 18.00,
+        }
+        res = self.client.post(f'{RECIPES_URL}?expand=tags', payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['tags'], [tag.id])
 
     def test_view_recipe_detail(self):
         """Test viewing a recipe detail"""
@@ -190,6 +277,110 @@ class PrivateRecipeApiTests(TestCase):
         self.assertIn(ingredient1, ingredients)
         self.assertIn(ingredient2, ingredients)
 
+    def test_create_recipe_with_names(self):
+        """Test creating a recipe with new and existing names and ids"""
+        existing = sample_ingredient(user=self.user, name='Garlic')
+        by_id = sample_ingredient(user=self.user, name='Ginger')
+        payload = {
+            'name': 'Stir fry',
+            'ingredients': [by_id.id, 'Garlic', 'Bok choy', 'Tofu'],
+            'tags': ['Vegan'],
+            'time_minutes': 15,
+            'price': 9.00,
+        }
+
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(
+            sorted(recipe.ingredients.values_list('name', flat=True)),
+            ['Bok choy', 'Garlic', 'Ginger', 'Tofu']
+        )
+        self.assertIn(existing, recipe.ingredients.all())
+        self.assertEqual(Ingredient.objects.count(), 4)
+        self.assertEqual(recipe.tags.get().name, 'Vegan')
+        inserts = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('INSERT INTO "core_ingredient"')
+        ]
+        self.assertEqual(len(inserts), 1)
+
+    def test_update_recipe_with_names(self):
+        """Test names can replace the tags of an existing recipe"""
+        recipe = sample_recipe(user=self.user)
+        recipe.tags.add(sample_tag(user=self.user, name='Old'))
+
+        res = self.client.patch(
+            detail_url(recipe.id), {'tags': ['Old', 'New']}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(recipe.tags.values_list('name', flat=True)),
+            ['New', 'Old']
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_create_recipe_invalid_name(self):
+        """Test blank names are rejected without creating anything"""
+        payload = {
+            'name': 'Soup',
+            'tags': ['Warm', '  '],
+            'time_minutes': 15,
+            'price': 9.00,
+        }
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Tag.objects.exists())
+
+    def test_create_recipe_validates_ids_in_one_query(self):
+        """Test related ids are checked with a single query per relation"""
+        ingredients = [
+            sample_ingredient(user=self.user, name=f'Ingredient {i}')
+            for i in range(50)
+        ]
+        request = APIRequestFactory().post(RECIPES_URL)
+        request.user = self.user
+        serializer = RecipeSerializer(
+            data={
+                'name': 'Everything soup',
+                'ingredients': [ingredient.id for ingredient in ingredients],
+                'tags': [],
+                'time_minutes': 60,
+                'price': 20.00,
+            },
+            context={'request': request}
+        )
+
+        with CaptureQueriesContext(connection) as context:
+            self.assertTrue(serializer.is_valid())
+
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertEqual(serializer.validated_data['ingredients'], ingredients)
+
+    def test_create_recipe_with_other_users_tag(self):
+        """Test recipes cannot reference tags of another user"""
+        other = get_user_model().objects.create_user(
+            'other@gmail.com',
+            'password123'
+        )
+        tag = sample_tag(user=other)
+        payload = {
+            'name': 'Borrowed',
+            'tags': [tag.id],
+            'time_minutes': 10,
+            'price': 5.00,
+        }
+
+        res = self.client.post(RECIPES_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tags', res.data)
+        self.assertFalse(Recipe.objects.exists())
+
     def test_partial_update_recipe(self):
         """Test partial updates on a recipe with patch"""
         recipe = sample_recipe(user=self.user)
@@ -234,6 +425,109 @@ class PrivateRecipeApiTests(TestCase):
         self.assertEqual(len(ingredients), 0)
 
 
+class RecipeQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Test the recipe endpoints stay within their query budgets"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com',
+            password='test123456',
+            name='Test Name'
+        )
+        self.client.force_authenticate(self.user)
+
+    def create_recipes(self, count):
+        """Create recipes that each have their own tag and ingredient"""
+        recipes = []
+        for i in range(count):
+            recipe = sample_recipe(user=self.user, name=f'Recipe {i}')
+            recipe.tags.add(sample_tag(user=self.user, name=f'Tag {i}'))
+            recipe.ingredients.add(
+                sample_ingredient(user=self.user, name=f'Ingredient {i}')
+            )
+            recipes.append(recipe)
+
+        return recipes
+
+    def test_recipe_list_within_budget(self):
+        """Test listing recipes runs a fixed number of queries"""
+        self.create_recipes(1)
+        with self.assertQueryBudget(QUERY_BUDGETS['recipe-list']) as small:
+            self.client.get(RECIPES_URL)
+
+        self.create_recipes(20)
+        with self.assertQueryBudget(QUERY_BUDGETS['recipe-list']) as large:
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            len(small.captured_queries),
+            len(large.captured_queries)
+        )
+
+    def test_filtered_recipe_list_within_budget(self):
+        """Test filtering recipes by tag runs a fixed number of queries"""
+        recipes = self.create_recipes(10)
+        tag_ids = ','.join(
+            str(tag.id) for tag in Tag.objects.filter(user=self.user)
+        )
+
+        with self.assertQueryBudget(QUERY_BUDGETS['recipe-list']):
+            res = self.client.get(RECIPES_URL, {'tags': tag_ids})
+
+        self.assertEqual(len(res.data['results']), len(recipes))
+
+    def test_deep_recipe_page_within_budget(self):
+        """Test a later page runs the same queries as the first page"""
+        self.create_recipes(10)
+        res = self.client.get(RECIPES_URL, {'page_size': 3})
+        for _ in range(2):
+            res = self.client.get(res.data['next'])
+
+        with self.assertQueryBudget(QUERY_BUDGETS['recipe-list']):
+            res = self.client.get(res.data['next'])
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_sparse_recipe_list_skips_related(self):
+        """Test sparse recipe lists do not query tags or ingredients"""
+        self.create_recipes(5)
+
+        with self.assertQueryBudget(1):
+            res = self.client.get(RECIPES_URL, {'fields': 'id,name'})
+
+        self.assertEqual(len(res.data['results']), 5)
+
+    def test_expanded_recipe_list_within_budget(self):
+        """Test expanding related objects prefetches them once each"""
+        self.create_recipes(5)
+
+        with self.assertQueryBudget(QUERY_BUDGETS['recipe-list']):
+            res = self.client.get(
+                RECIPES_URL,
+                {'expand': 'tags,ingredients'}
+            )
+
+        self.assertEqual(res.data['results'][0]['tags'][0]['name'], 'Tag 4')
+
+    def test_recipe_detail_within_budget(self):
+        """Test viewing a recipe detail runs a fixed number of queries"""
+        recipe = sample_recipe(user=self.user)
+        for i in range(10):
+            recipe.tags.add(sample_tag(user=self.user, name=f'Tag {i}'))
+            recipe.ingredients.add(
+                sample_ingredient(user=self.user, name=f'Ingredient {i}')
+            )
+
+        with self.assertQueryBudget(QUERY_BUDGETS['recipe-detail']):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['tags']), 10)
+        self.assertEqual(len(res.data['ingredients']), 10)
+
+
 class RecipeImageUploadTests(TestCase):
 
     def setUp(self):
@@ -287,9 +581,9 @@ class RecipeImageUploadTests(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
 
     def test_filter_recipes_by_ingredients(self):
         """Test returning recipes with specific ingredients"""
@@ -314,6 +608,472 @@ class RecipeImageUploadTests(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
+
+
+class RecipeFilterTests(TestCase):
+    """Test the recipe tag and ingredient filter modes"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com',
+            password='test123456',
+            name='Test Name'
+        )
+        self.client.force_authenticate(self.user)
+        self.spicy = sample_tag(user=self.user, name='Spicy')
+        self.noodles = sample_tag(user=self.user, name='Noodles')
+        self.both = sample_recipe(user=self.user, name='Dan dan noodles')
+        self.both.tags.add(self.spicy, self.noodles)
+        self.spicy_only = sample_recipe(user=self.user, name='Mapo Tofu')
+        self.spicy_only.tags.add(self.spicy)
+        self.untagged = sample_recipe(user=self.user, name='Congee')
+
+    def get_ids(self, params):
+        """Return the ids of recipes listed with the given params"""
+        res = self.client.get(RECIPES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return [recipe['id'] for recipe in res.data['results']]
+
+    def test_filter_any_unique(self):
+        """Test recipes matching several tags are listed once"""
+        ids = self.get_ids({'tags': f'{self.spicy.id},{self.noodles.id}'})
+
+        self.assertEqual(ids, [self.spicy_only.id, self.both.id])
+
+    def test_filter_all(self):
+        """Test filtering recipes that have all the given tags"""
+        ids = self.get_ids({
+            'tags': f'{self.spicy.id},{self.noodles.id}',
+            'tags_match': 'all',
+        })
+
+        self.assertEqual(ids, [self.both.id])
+
+    def test_filter_all_single_query_without_joins(self):
+        """Test an all filter groups the through table instead of joins"""
+        tags = [self.spicy, self.noodles] + [
+            sample_tag(user=self.user, name=f'Tag {i}') for i in range(8)
+        ]
+        with CaptureQueriesContext(connection) as context:
+            self.get_ids({
+                'tags': ','.join(str(tag.id) for tag in tags),
+                'tags_match': 'all',
+                'fields': 'id',
+            })
+
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertNotIn('JOIN', context.captured_queries[0]['sql'])
+
+    def test_exclude_tags(self):
+        """Test excluding recipes that have any of the given tags"""
+        ids = self.get_ids({'tags_exclude': str(self.noodles.id)})
+
+        self.assertEqual(ids, [self.untagged.id, self.spicy_only.id])
+
+    def test_exclude_ingredients(self):
+        """Test excluding recipes that have any of the given ingredients"""
+        tofu = sample_ingredient(user=self.user, name='Tofu')
+        self.spicy_only.ingredients.add(tofu)
+
+        ids = self.get_ids({'ingredients_exclude': str(tofu.id)})
+
+        self.assertEqual(ids, [self.untagged.id, self.both.id])
+
+    def test_invalid_match_mode(self):
+        """Test an unknown match mode is rejected"""
+        res = self.client.get(RECIPES_URL, {
+            'tags': str(self.spicy.id),
+            'tags_match': 'most',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_ids(self):
+        """Test non integer ids are rejected"""
+        res = self.client.get(RECIPES_URL, {'ingredients': 'tofu'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_by_name(self):
+        """Test searching recipes by words in their name"""
+        ids = self.get_ids({'search': 'tofu'})
+
+        self.assertEqual(ids, [self.spicy_only.id])
+
+    def test_search_ranked(self):
+        """Test closer search matches are listed first"""
+        noodles = sample_recipe(user=self.user, name='Noodles')
+        prefix = sample_recipe(user=self.user, name='Noodles with chilli')
+
+        ids = self.get_ids({'search': 'noodles'})
+
+        self.assertEqual(ids, [noodles.id, prefix.id, self.both.id])
+
+    def test_search_paginated(self):
+        """Test paging through ranked search results"""
+        for i in range(3):
+            sample_recipe(user=self.user, name=f'Tofu skin {i}')
+
+        res = self.client.get(RECIPES_URL, {'search': 'tofu', 'page_size': 2})
+        first = [recipe['name'] for recipe in res.data['results']]
+        res = self.client.get(res.data['next'])
+        second = [recipe['name'] for recipe in res.data['results']]
+
+        self.assertEqual(
+            first + second,
+            ['Tofu skin 2', 'Tofu skin 1', 'Tofu skin 0', 'Mapo Tofu']
+        )
+
+    def test_search_paginated_by_rank(self):
+        """Test paging one result at a time through differing ranks"""
+        for name in ('Fried tofu and braised tofu', 'Cold tofu',
+                     'Braised tofu with tofu skin and tofu puffs'):
+            sample_recipe(user=self.user, name=name)
+
+        names = []
+        url, params = RECIPES_URL, {'search': 'tofu', 'page_size': 1}
+        while url:
+            res = self.client.get(url, params)
+            names.extend(recipe['name'] for recipe in res.data['results'])
+            url, params = res.data['next'], None
+
+        self.assertEqual(len(names), 4)
+        self.assertEqual(len(set(names)), 4)
+
+    def test_search_blank(self):
+        """Test a blank search lists every recipe"""
+        ids = self.get_ids({'search': '   '})
+
+        self.assertEqual(len(ids), 3)
+
+    def test_search_combined_with_filters(self):
+        """Test search applies together with tag filters"""
+        ids = self.get_ids({'search': 'noodles', 'tags': str(self.spicy.id)})
+
+        self.assertEqual(ids, [self.both.id])
+
+
+class RecipeOrderingTests(TestCase):
+    """Test recipe range filters and orderings"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com',
+            password='test123456',
+            name='Test Name'
+        )
+        self.client.force_authenticate(self.user)
+        self.cheap = sample_recipe(
+            user=self.user, name='Congee', price=3.50, time_minutes=60)
+        self.quick = sample_recipe(
+            user=self.user, name='Toast', price=5.00, time_minutes=5)
+        self.fancy = sample_recipe(
+            user=self.user, name='Peking duck', price=80.00, time_minutes=240)
+
+    def get_ids(self, params):
+        """Return the ids of recipes listed with the given params"""
+        res = self.client.get(RECIPES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return [recipe['id'] for recipe in res.data['results']]
+
+    def test_filter_price_range(self):
+        """Test filtering recipes by minimum and maximum price"""
+        ids = self.get_ids({'price_min': '4', 'price_max': '50.00'})
+
+        self.assertEqual(ids, [self.quick.id])
+
+    def test_filter_time_max(self):
+        """Test filtering recipes by maximum preparation time"""
+        ids = self.get_ids({'time_max': 60})
+
+        self.assertEqual(ids, [self.quick.id, self.cheap.id])
+
+    def test_order_by_price(self):
+        """Test ordering recipes by price either way"""
+        self.assertEqual(
+            self.get_ids({'ordering': 'price'}),
+            [self.cheap.id, self.quick.id, self.fancy.id]
+        )
+        self.assertEqual(
+            self.get_ids({'ordering': '-price'}),
+            [self.fancy.id, self.quick.id, self.cheap.id]
+        )
+
+    def test_order_by_time_with_filter(self):
+        """Test ordering recipes by time within a price range"""
+        ids = self.get_ids({'ordering': 'time_minutes', 'price_max': 10})
+
+        self.assertEqual(ids, [self.quick.id, self.cheap.id])
+
+    def test_paginate_through_ties(self):
+        """Test pages resume after recipes sharing the same price"""
+        same = [
+            sample_recipe(user=self.user, name=f'Bun {i}', price=5.00)
+            for i in range(4)
+        ]
+
+        seen = []
+        res = self.client.get(RECIPES_URL, {
+            'ordering': 'price', 'page_size': 2,
+        })
+        while True:
+            seen.extend(recipe['id'] for recipe in res.data['results'])
+            if res.data['next'] is None:
+                break
+            res = self.client.get(res.data['next'])
+
+        self.assertEqual(
+            seen,
+            [self.cheap.id, self.quick.id] + [r.id for r in same] +
+            [self.fancy.id]
+        )
+
+        res = self.client.get(res.data['previous'])
+        self.assertEqual(
+            [recipe['id'] for recipe in res.data['results']],
+            [same[2].id, same[3].id]
+        )
+
+    def test_invalid_ordering(self):
+        """Test orderings without a matching index are rejected"""
+        res = self.client.get(RECIPES_URL, {'ordering': 'name'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_tampered_cursor(self):
+        """Test cursors with positions of the wrong type are rejected"""
+        for ordering, position in (('-id', '["abc"]'),
+                                   ('price', '["cheap","1"]'),
+                                   ('price', '[[1],"1"]')):
+            cursor = b64encode(urlencode({'p': position}).encode()).decode()
+            res = self.client.get(
+                RECIPES_URL, {'ordering': ordering, 'cursor': cursor})
+
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_invalid_range(self):
+        """Test non numeric range filters are rejected"""
+        for params in ({'price_min': 'cheap'}, {'time_max': '1.5'},
+                       {'price_max': 'NaN'}):
+            res = self.client.get(RECIPES_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecipeBulkTests(TestCase):
+    """Test the bulk recipe endpoints"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com',
+            password='test123456',
+            name='Test Name'
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = sample_tag(user=self.user)
+        self.ingredient = sample_ingredient(user=self.user)
+
+    def payload(self, count):
+        """Return a bulk payload for recipes using the sample relations"""
+        return [
+            {
+                'name': f'Recipe {i}',
+                'time_minutes': 10 + i,
+                'price': '5.00',
+                'tags': [self.tag.id],
+                'ingredients': [self.ingredient.id],
+            }
+            for i in range(count)
+        ]
+
+    def test_bulk_create(self):
+        """Test creating a list of recipes with their relations"""
+        res = self.client.post(BULK_URL, self.payload(3), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [recipe['name'] for recipe in res.data],
+            ['Recipe 0', 'Recipe 1', 'Recipe 2']
+        )
+        recipes = Recipe.objects.filter(user=self.user)
+        self.assertEqual(recipes.count(), 3)
+        for recipe in recipes:
+            self.assertEqual(list(recipe.tags.all()), [self.tag])
+            self.assertEqual(
+                list(recipe.ingredients.all()),
+                [self.ingredient]
+            )
+        self.tag.refresh_from_db()
+        self.assertEqual(self.tag.recipe_count, 3)
+
+    def test_bulk_create_batched_inserts(self):
+        """Test recipes and their links are inserted in one statement each"""
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.post(BULK_URL, self.payload(20), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        inserts = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('INSERT')
+        ]
+        self.assertEqual(len(inserts), 3)
+
+    def test_bulk_create_queries_independent_of_size(self):
+        """Test a bulk create runs the same queries for 2 or 20 recipes"""
+        counts = []
+        for size in (2, 20):
+            with CaptureQueriesContext(connection) as context:
+                res = self.client.post(
+                    BULK_URL, self.payload(size), format='json')
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            counts.append(len(context.captured_queries))
+
+        self.assertEqual(counts[0], counts[1])
+
+    def test_bulk_create_shared_names(self):
+        """Test names shared by several items are created once"""
+        payload = self.payload(3)
+        for item in payload:
+            item['tags'] = ['Weeknight', self.tag.name]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        weeknight = Tag.objects.get(name='Weeknight')
+        self.assertEqual(weeknight.recipe_count, 3)
+        self.assertEqual(Tag.objects.count(), 2)
+
+    def test_bulk_create_item_errors(self):
+        """Test invalid items are reported and nothing is created"""
+        payload = self.payload(3)
+        payload[1]['name'] = ''
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('name', res.data[1])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_create_size_capped(self):
+        """Test requests over the bulk size limit are rejected"""
+        res = self.client.post(BULK_URL, self.payload(101), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_create_requires_list(self):
+        """Test a single object is rejected by the bulk endpoint"""
+        res = self.client.post(BULK_URL, self.payload(1)[0], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_partial_update(self):
+        """Test updating fields and relations of many recipes at once"""
+        recipes = [
+            sample_recipe(user=self.user, name=f'Recipe {i}', price=5.00)
+            for i in range(3)
+        ]
+        recipes[0].tags.add(self.tag)
+        spicy = sample_tag(user=self.user, name='Spicy')
+        payload = [
+            {'id': recipes[0].id, 'price': '6.50', 'tags': [spicy.id]},
+            {'id': recipes[1].id, 'price': '7.00', 'name': 'Renamed'},
+            {'id': recipes[2].id, 'time_minutes': 45},
+        ]
+
+        res = self.client.patch(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        for recipe in recipes:
+            recipe.refresh_from_db()
+        self.assertEqual(str(recipes[0].price), '6.50')
+        self.assertEqual(list(recipes[0].tags.all()), [spicy])
+        self.assertEqual(recipes[1].name, 'Renamed')
+        self.assertEqual(str(recipes[1].price), '7.00')
+        self.assertEqual(recipes[2].time_minutes, 45)
+        self.assertEqual(str(recipes[2].price), '5.00')
+        self.tag.refresh_from_db()
+        spicy.refresh_from_db()
+        self.assertEqual((self.tag.recipe_count, spicy.recipe_count), (0, 1))
+
+    def test_bulk_update_queries_independent_of_size(self):
+        """Test a bulk update runs the same queries for 2 or 20 recipes"""
+        counts = []
+        for size in (2, 20):
+            recipes = [
+                sample_recipe(user=self.user, name=f'Recipe {i}')
+                for i in range(size)
+            ]
+            payload = [
+                {'id': recipe.id, 'price': '9.99', 'tags': [self.tag.id]}
+                for recipe in recipes
+            ]
+            with CaptureQueriesContext(connection) as context:
+                res = self.client.patch(BULK_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            counts.append(len(context.captured_queries))
+
+        self.assertEqual(counts[0], counts[1])
+
+    def test_bulk_update_other_users_recipe(self):
+        """Test recipes of other users cannot be updated in bulk"""
+        other = get_user_model().objects.create_user(
+            'other@gmail.com',
+            'password123'
+        )
+        mine = sample_recipe(user=self.user)
+        theirs = sample_recipe(user=other, name='Not yours')
+
+        res = self.client.patch(BULK_URL, [
+            {'id': mine.id, 'name': 'Mine'},
+            {'id': theirs.id, 'name': 'Taken'},
+        ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('id', res.data[1])
+        theirs.refresh_from_db()
+        mine.refresh_from_db()
+        self.assertEqual(theirs.name, 'Not yours')
+        self.assertNotEqual(mine.name, 'Mine')
+
+    def test_bulk_delete(self):
+        """Test deleting a list of recipes"""
+        recipes = [
+            sample_recipe(user=self.user, name=f'Recipe {i}')
+            for i in range(3)
+        ]
+        recipes[0].tags.add(self.tag)
+
+        res = self.client.delete(
+            BULK_URL, [recipes[0].id, recipes[1].id], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(
+            list(Recipe.objects.values_list('id', flat=True)),
+            [recipes[2].id]
+        )
+        self.tag.refresh_from_db()
+        self.assertEqual(self.tag.recipe_count, 0)
+
+    def test_bulk_delete_unknown_ids(self):
+        """Test nothing is deleted when any id is not the user's"""
+        recipe = sample_recipe(user=self.user)
+
+        res = self.client.delete(
+            BULK_URL, [recipe.id, recipe.id + 100, 'x'], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('id', res.data[1])
+        self.assertIn('id', res.data[2])
+        self.assertTrue(Recipe.objects.filter(id=recipe.id).exists())
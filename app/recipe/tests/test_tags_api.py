@@ -1,3 +1,6 @@
+from base64 import b64encode
+from urllib.parse import urlencode
+
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.test import TestCase
@@ -41,7 +44,7 @@ class PrivateTagsApiTests(TestCase):
         serializer = TagSerializer(tags, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_tags_limited_to_user(self):
         """Test that tags are returned for the authenticated user"""
@@ -64,7 +67,27 @@ class PrivateTagsApiTests(TestCase):
         serializer = TagSerializer(tags, many=True)
 
         # Check that values match between res.data and serializer.data
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
+
+    def test_tags_paginated_by_name(self):
+        """Test tags are paginated in reverse name order"""
+        for name in ('Breakfast', 'Cantonese', 'Dim Sum', 'Lunch'):
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {'page_size': 3})
+
+        self.assertEqual(
+            [tag['name'] for tag in res.data['results']],
+            ['Lunch', 'Dim Sum', 'Cantonese']
+        )
+
+        res = self.client.get(res.data['next'])
+
+        self.assertEqual(
+            [tag['name'] for tag in res.data['results']],
+            ['Breakfast']
+        )
+        self.assertIsNone(res.data['next'])
 
     def test_create_tag_successful(self):
         """Test authenticated user can create tags successfully"""
@@ -100,8 +123,8 @@ class PrivateTagsApiTests(TestCase):
 
         serializer1 = TagSerializer(tag1)
         serializer2 = TagSerializer(tag2)
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertNotIn(serializer2.data, res.data['results'])
 
     def test_retrieve_tags_assigned_unique(self):
         """Test filtering tags by assigned returns unique items"""
@@ -124,4 +147,72 @@ class PrivateTagsApiTests(TestCase):
 
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_tags_ordered_by_usage(self):
+        """Test ordering tags by the number of recipes using them"""
+        popular = Tag.objects.create(user=self.user, name='Dinner')
+        rare = Tag.objects.create(user=self.user, name='Brunch')
+        Tag.objects.create(user=self.user, name='Supper')
+        for name in ('Ramen', 'Curry'):
+            recipe = Recipe.objects.create(
+                name=name, time_minutes=20, price=8.00, user=self.user
+            )
+            recipe.tags.add(popular)
+        recipe.tags.add(rare)
+
+        res = self.client.get(TAGS_URL, {'ordering': '-usage'})
+        names = [tag['name'] for tag in res.data['results']]
+        self.assertEqual(names, ['Dinner', 'Brunch', 'Supper'])
+
+        res = self.client.get(TAGS_URL, {'min_usage': 2})
+        names = [tag['name'] for tag in res.data['results']]
+        self.assertEqual(names, ['Dinner'])
+
+    def test_tags_tampered_cursor(self):
+        """Test cursors with positions of the wrong type are rejected"""
+        cursor = b64encode(urlencode({'p': '["Lunch","abc"]'}).encode())
+
+        res = self.client.get(TAGS_URL, {'cursor': cursor.decode()})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tags_invalid_ordering(self):
+        """Test unsupported orderings and usage filters are rejected"""
+        res = self.client.get(TAGS_URL, {'ordering': 'user'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(TAGS_URL, {'min_usage': 'many'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_autocomplete_tags(self):
+        """Test autocompleting tags by prefix and close spelling"""
+        Tag.objects.create(user=self.user, name='Dinner')
+        Tag.objects.create(user=self.user, name='Dim Sum')
+        Tag.objects.create(user=self.user, name='Breakfast')
+
+        res = self.client.get(TAGS_URL, {'q': 'di'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        # both start with di, 'Dinner' shares more of its trigrams
+        self.assertEqual(
+            [tag['name'] for tag in res.data],
+            ['Dinner', 'Dim Sum']
+        )
+
+        res = self.client.get(TAGS_URL, {'q': 'brekfast'})
+
+        self.assertEqual([tag['name'] for tag in res.data], ['Breakfast'])
+
+    def test_autocomplete_limited_to_user(self):
+        """Test autocompletion only returns the user's own tags"""
+        test_user = get_user_model().objects.create_user(
+            email='test1@gmail.com',
+            password='test123456',
+        )
+        Tag.objects.create(user=self.user, name='Dinner')
+        Tag.objects.create(user=test_user, name='Dim Sum')
+
+        res = self.client.get(TAGS_URL, {'q': 'di'})
+
+        self.assertEqual([tag['name'] for tag in res.data], ['Dinner'])
@@ -1,32 +1,99 @@
+from decimal import Decimal
+
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import viewsets, mixins, status
 from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 
+from core import purge
 from core.models import Tag, Ingredient, Recipe
+from core.timing import ServerTimingMixin
 
-from recipe import serializers
+from recipe import bulk, export, filters, search, serializers
+from recipe.caching import ConditionalCacheMixin
+from recipe.fastpath import ValuesListMixin
+from recipe.pagination import RecipeCursorPagination, NameCursorPagination
 
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
+class BaseRecipeAttrViewSet(ServerTimingMixin,
+                            ConditionalCacheMixin,
+                            ValuesListMixin,
+                            viewsets.GenericViewSet,
                             mixins.ListModelMixin,
                             mixins.CreateModelMixin):
     """Base viewset for user owned recipe attributes"""
     authentication_classes = (TokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = NameCursorPagination
+    # number of matches returned for ?q= autocompletion
+    autocomplete_limit = 10
+    max_autocomplete_limit = 50
+    # supported ?ordering= values, the id keeps the cursor position unique
+    ordering_choices = {
+        '-name': ('-name', '-id'),
+        'name': ('name', 'id'),
+        '-usage': ('-recipe_count', '-id'),
+        'usage': ('recipe_count', 'id'),
+    }
+
+    @property
+    def paginator(self):
+        """Return the paginator, autocompletion returns a single list"""
+        if self.request.query_params.get('q'):
+            return None
+
+        return super().paginator
+
+    def _autocomplete_limit(self):
+        """Return the number of matches requested for autocompletion"""
+        try:
+            limit = int(self.request.query_params.get(
+                'limit', self.autocomplete_limit))
+        except ValueError:
+            raise ValidationError({'limit': 'Must be an integer.'})
+
+        return max(1, min(limit, self.max_autocomplete_limit))
+
+    def get_ordering(self):
+        """Return the ordering requested with ?ordering="""
+        ordering = self.request.query_params.get('ordering', '-name')
+        if ordering not in self.ordering_choices:
+            raise ValidationError({'ordering': 'Must be one of: {}.'.format(
+                ', '.join(self.ordering_choices))})
+
+        return self.ordering_choices[ordering]
 
     def get_queryset(self):
         """Return objects for the authenticated user only"""
-        assigned_only = bool(
-            int(self.request.query_params.get('assigned_only', 0))
-        )
+        params = self.request.query_params
+        assigned_only = bool(int(params.get('assigned_only', 0)))
         queryset = self.queryset
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+            queryset = filters.filter_assigned(queryset)
+        if params.get('min_usage'):
+            try:
+                min_usage = int(params['min_usage'])
+            except ValueError:
+                raise ValidationError({'min_usage': 'Must be an integer.'})
+            # recipe_count is kept up to date by core.signals
+            queryset = queryset.filter(recipe_count__gte=min_usage)
+
+        queryset = queryset.filter(
+            user=self.request.user).order_by(*self.get_ordering())
+
+        q = self.request.query_params.get('q')
+        if q:
+            queryset = search.autocomplete(
+                queryset, q, self._autocomplete_limit()
+            )
+        if self.action == 'list':
+            queryset = queryset.cached(user=self.request.user)
 
-        return queryset.filter(
-            user=self.request.user).order_by('-name').distinct()
+        return queryset
 
     def perform_create(self, serializer):
         """Create a new object"""
@@ -45,31 +112,146 @@ class IngredientViewSet(BaseRecipeAttrViewSet):
     serializer_class = serializers.IngredientSerializer
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ServerTimingMixin,
+                    ConditionalCacheMixin,
+                    ValuesListMixin,
+                    viewsets.ModelViewSet):
     """Manage recipes in the database"""
     # make sure to add the viewset in the urls.py
     queryset = Recipe.objects.all().order_by('-id')
     serializer_class = serializers.RecipeSerializer
     authentication_classes = (TokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = RecipeCursorPagination
+    # related objects are loaded in id order to match the values based
+    # list output, see recipe.fastpath
+    related_querysets = {
+        'tags': Tag.objects.order_by('id'),
+        'ingredients': Ingredient.objects.order_by('id'),
+    }
+    # supported ?ordering= values, each read in order from an index on
+    # the user and the same fields, the id keeps the cursor unique
+    ordering_choices = {
+        '-id': ('-id',),
+        'price': ('price', 'id'),
+        '-price': ('-price', '-id'),
+        'time_minutes': ('time_minutes', 'id'),
+        '-time_minutes': ('-time_minutes', '-id'),
+    }
+    # most recipes accepted by one bulk request
+    max_bulk_size = 100
+    # recipes fetched per query while streaming an export
+    export_chunk_size = 1000
+    # query parameter: (lookup, conversion)
+    range_filters = {
+        'price_min': ('price__gte', Decimal),
+        'price_max': ('price__lte', Decimal),
+        'time_max': ('time_minutes__lte', int),
+    }
 
-    def _params_to_ints(self, qs):
+    def _params_to_ints(self, qs, param):
         """Convert a list of string IDs to a list of integers"""
-        return [int(str_id) for str_id in qs.split(',')]
+        try:
+            return [int(str_id) for str_id in qs.split(',')]
+        except ValueError:
+            raise ValidationError({param: 'Must be a list of integer ids.'})
+
+    def _param_to_number(self, value, param, convert):
+        """Convert a string to a finite number"""
+        try:
+            number = convert(value)
+            if not Decimal(number).is_finite():
+                raise ValueError(value)
+        except (ValueError, ArithmeticError):
+            raise ValidationError({param: 'Must be a number.'})
+
+        return number
 
     def get_queryset(self):
         """Retrieve the recipes for the authenticated user"""
-        tags = self.request.query_params.get('tags')
-        ingredients = self.request.query_params.get('ingredients')
+        params = self.request.query_params
         queryset = self.queryset
-        if tags:
-            tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
-        if ingredients:
-            ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+        for field in self.related_querysets:
+            # ?tags=1,2&tags_match=all and ?tags_exclude=3, same for
+            # ingredients, see recipe.filters
+            if params.get(field):
+                queryset = filters.filter_related(
+                    queryset,
+                    field,
+                    self._params_to_ints(params[field], field),
+                    params.get(f'{field}_match', filters.MATCH_ANY)
+                )
+            if params.get(f'{field}_exclude'):
+                queryset = filters.exclude_related(
+                    queryset,
+                    field,
+                    self._params_to_ints(
+                        params[f'{field}_exclude'], f'{field}_exclude'
+                    )
+                )
+
+        for param, (lookup, convert) in self.range_filters.items():
+            if params.get(param):
+                queryset = queryset.filter(**{
+                    lookup: self._param_to_number(
+                        params[param], param, convert)
+                })
 
-        return queryset.filter(user=self.request.user)
+        terms = self._search_terms()
+        if terms:
+            queryset = search.search_recipes(queryset, terms)
+
+        queryset = queryset.filter(user=self.request.user)
+        if self.action == 'upload_image':
+            return queryset
+
+        related = list(self.related_querysets)
+        if self.action in ('list', 'retrieve'):
+            queryset = queryset.cached(user=self.request.user)
+            fields = serializers.split_query_param(self.request, 'fields')
+            if fields is not None:
+                # only fetch the columns and relations that will be output
+                related = [name for name in related if name in fields]
+                columns = [
+                    name for name in self.serializer_class.Meta.fields
+                    if name in fields and name not in self.related_querysets
+                ]
+                queryset = queryset.only('id', *columns)
+
+        # load tags and ingredients for every recipe in one query each
+        # instead of two extra queries per recipe during serialization
+        return queryset.prefetch_related(*[
+            Prefetch(name, queryset=self.related_querysets[name])
+            for name in related
+        ])
+
+    def get_ordering(self):
+        """Return the ordering for the current request"""
+        ordering = self.request.query_params.get('ordering')
+        if ordering is not None:
+            # anything else would sort every recipe of the user
+            if ordering not in self.ordering_choices:
+                raise ValidationError({
+                    'ordering': 'Must be one of: {}.'.format(
+                        ', '.join(self.ordering_choices))
+                })
+            return self.ordering_choices[ordering]
+
+        if self._search_terms():
+            # best matches first, see recipe.search
+            return ('-name_match', '-rank', '-id')
+
+        return None
+
+    def _search_terms(self):
+        """Return the ?search= terms, blank ones search for nothing"""
+        return self.request.query_params.get('search', '').strip()
+
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve a recipe, answering from the cache where possible"""
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
 
     def get_serializer_class(self):
         """Return appropriate serializer class"""
@@ -86,6 +268,145 @@ class RecipeViewSet(viewsets.ModelViewSet):
         # model viewset allows you to create objects out of the box
         serializer.save(user=self.request.user)
 
+    def perform_destroy(self, instance):
+        """Delete a recipe, removing its image once the delete commits"""
+        purge.delete_recipes(instance.user_id, [instance.pk])
+
+    def _bulk_items(self, request):
+        """Return the list of items sent to a bulk endpoint"""
+        if not isinstance(request.data, list):
+            raise ValidationError({'non_field_errors': ['Expected a list.']})
+        if len(request.data) > self.max_bulk_size:
+            raise ValidationError({'non_field_errors': [
+                f'At most {self.max_bulk_size} items per request.'
+            ]})
+
+        return request.data
+
+    @action(methods=['POST'], detail=False, url_path='bulk',
+            url_name='bulk')
+    def bulk_create(self, request):
+        """Create a list of recipes in a single transaction"""
+        serializer = self.get_serializer(
+            data=self._bulk_items(request),
+            many=True
+        )
+        if not serializer.is_valid():
+            # one error dict per item, empty for the valid ones
+            return Response(
+                serializer.errors,
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        recipes = bulk.create_recipes(
+            self.request.user,
+            serializer.validated_data
+        )
+
+        return self._bulk_response(
+            [recipe.pk for recipe in recipes],
+            status.HTTP_201_CREATED
+        )
+
+    @bulk_create.mapping.patch
+    def bulk_update(self, request):
+        """Partially update a list of recipes identified by their ids"""
+        items = self._bulk_items(request)
+        ids = []
+        for item in items:
+            try:
+                ids.append(int(item.get('id')))
+            except (AttributeError, TypeError, ValueError):
+                ids.append(None)
+        # a single query checks every recipe belongs to the user
+        owned = set(Recipe.objects.filter(
+            user=self.request.user,
+            pk__in=[pk for pk in ids if pk is not None]
+        ).values_list('id', flat=True))
+
+        serializer = self.get_serializer(data=items, many=True, partial=True)
+        serializer.is_valid()
+        errors = serializer.errors or [{} for _ in items]
+        seen = set()
+        for pk, item_errors in zip(ids, errors):
+            if pk is None:
+                item_errors['id'] = ['A valid integer id is required.']
+            elif pk not in owned:
+                item_errors['id'] = ['Not found.']
+            elif pk in seen:
+                item_errors['id'] = ['Listed more than once.']
+            seen.add(pk)
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        bulk.update_recipes(
+            self.request.user,
+            list(zip(ids, serializer.validated_data))
+        )
+
+        return self._bulk_response(ids, status.HTTP_200_OK)
+
+    @bulk_create.mapping.delete
+    def bulk_destroy(self, request):
+        """Delete a list of recipes given by their ids"""
+        ids = []
+        for pk in self._bulk_items(request):
+            try:
+                ids.append(int(pk))
+            except (TypeError, ValueError):
+                ids.append(None)
+        owned = set(Recipe.objects.filter(
+            user=self.request.user,
+            pk__in=[pk for pk in ids if pk is not None]
+        ).values_list('id', flat=True))
+
+        errors = [{} for _ in ids]
+        for pk, item_errors in zip(ids, errors):
+            if pk is None:
+                item_errors['id'] = ['A valid integer id is required.']
+            elif pk not in owned:
+                item_errors['id'] = ['Not found.']
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        purge.delete_recipes(self.request.user.pk, ids)
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def _bulk_response(self, ids, status_code):
+        """Return the recipes written by a bulk request"""
+        recipes = Recipe.objects.filter(pk__in=ids).order_by(
+            'id').prefetch_related(*[
+                Prefetch(name, queryset=related)
+                for name, related in self.related_querysets.items()
+            ])
+
+        return Response(
+            self.get_serializer(recipes, many=True).data,
+            status=status_code
+        )
+
+    @action(methods=['GET'], detail=False)
+    def export(self, request):
+        """Stream every matching recipe as NDJSON or CSV"""
+        output = request.query_params.get('output', 'ndjson')
+        if output not in export.FORMATS:
+            raise ValidationError({'output': 'Must be one of: {}.'.format(
+                ', '.join(export.FORMATS))})
+
+        rows = export.snapshot_rows(
+            self.get_queryset(),
+            self.export_chunk_size
+        )
+        response = StreamingHttpResponse(
+            export.RENDERERS[output](rows),
+            content_type=export.FORMATS[output]
+        )
+        response['Content-Disposition'] = \
+            f'attachment; filename="recipes.{output}"'
+
+        return response
+
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
         """Upload an image to a recipe"""
@@ -1,10 +1,14 @@
-from django.test import TestCase
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from core.models import Tag
+
 
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse('user:token')
@@ -149,3 +153,24 @@ class PrivateUserApiTests(TestCase):
         self.assertTrue(self.user.check_password(payload['password']))
         self.assertEqual(self.user.name, payload['name'])
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(ACCOUNT_PURGE_IN_BACKGROUND=False)
+    def test_delete_account(self):
+        """Test deleting the account removes the user and their data"""
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.delete(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(get_user_model().objects.exists())
+        self.assertFalse(Tag.objects.exists())
+
+    @patch('core.purge.purge_user_in_background')
+    def test_delete_account_in_background(self, purge_in_background):
+        """Test closing the account deactivates it before the purge"""
+        res = self.client.delete(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        purge_in_background.assert_called_once_with(self.user.pk)
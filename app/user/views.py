@@ -1,16 +1,21 @@
+from django.conf import settings
 from rest_framework import generics, authentication, permissions
+from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
 
+from core import purge
+from core.timing import ServerTimingMixin
+
 from user.serializers import UserSerializer, AuthTokenSerializer
 
 
-class CreateUserView(generics.CreateAPIView):
+class CreateUserView(ServerTimingMixin, generics.CreateAPIView):
     """Create a new user in the system"""
     serializer_class = UserSerializer
 
 
-class CreateTokenView(ObtainAuthToken):
+class CreateTokenView(ServerTimingMixin, ObtainAuthToken):
     """"Create a new auth token for user"""
     serializer_class = AuthTokenSerializer
     # set the renderer so we can view the endpoint in the browser
@@ -18,7 +23,8 @@ class CreateTokenView(ObtainAuthToken):
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+class ManageUserView(ServerTimingMixin,
+                     generics.RetrieveUpdateDestroyAPIView):
     """Manage the authenticated user"""
     serializer_class = UserSerializer
     authentication_classes = (authentication.TokenAuthentication,)
@@ -30,3 +36,14 @@ class ManageUserView(generics.RetrieveUpdateAPIView):
         """Retrieve and return authenticated user"""
         # with authentication_class, user is assigned to request
         return self.request.user
+
+    def perform_destroy(self, instance):
+        """Close the account now and delete its data in bulk"""
+        instance.is_active = False
+        instance.save(update_fields=['is_active'])
+        Token.objects.filter(user=instance).delete()
+
+        if settings.ACCOUNT_PURGE_IN_BACKGROUND:
+            purge.purge_user_in_background(instance.pk)
+        else:
+            purge.purge_user(instance.pk)